@@ -1,14 +1,36 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
+from __future__ import annotations
+
+import time
+
+# Başlangıç zaman çizelgesi için referans an
+STARTUP_STARTED = time.perf_counter()
+
 import os
 import logging
 import json
-from datetime import datetime
+import math
+import queue
+import re
+import heapq
+import operator
+import threading
+import functools
+import multiprocessing
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from bisect import bisect_left, bisect_right
+from datetime import datetime, date, time as dt_time, timedelta, timezone
+from typing import TYPE_CHECKING
 from dotenv import load_dotenv
-from telegram import Update, ParseMode, InlineKeyboardButton, InlineKeyboardMarkup
-from telegram.ext import Updater, CommandHandler, CallbackContext, MessageHandler, Filters, CallbackQueryHandler
-from pycoingecko import CoinGeckoAPI
+
+# telegram ve pycoingecko paketleri açılışı hızlandırmak için ilk kullanıldıkları
+# yerde içe aktarılır; burada yalnızca tip ipuçları için gereklidir
+if TYPE_CHECKING:
+    from telegram import Update
+    from telegram.ext import CallbackContext
 
 # Loglama yapılandırması
 logging.basicConfig(
@@ -20,13 +42,129 @@ logger = logging.getLogger(__name__)
 # .env dosyasından çevresel değişkenleri yükle
 load_dotenv()
 
-# CoinGecko API istemcisini başlat
-cg = CoinGeckoAPI()
+# CoinGecko API istemcisi (get_cg() ile ilk kullanımda oluşturulur)
+cg = None
+cg_lock = threading.Lock()
+
+# Kullanıcı verilerinin farklı iş parçacıklarından değiştirilmesini ve
+# kaydedilmek üzere serileştirilmesini sıraya sokan kilit (dosya yazımı bu
+# kilidin dışında yapılır)
+store_lock = threading.RLock()
+# Dosya başına yazma kilidi ve sıra numaraları (write_json_store)
+store_writes = {}
+
+# Telegram mesajlarında kullanılan ayrıştırma modu (telegram.PARSE_MODE_MARKDOWN)
+PARSE_MODE_MARKDOWN = 'Markdown'
+
+# Sağlık/hazır olma uç noktalarının dinleyeceği adres ve port (0: kapalı)
+HEALTH_HOST = os.getenv("HEALTH_HOST", "0.0.0.0")
+HEALTH_PORT = int(os.getenv("HEALTH_PORT", "8080"))
+
+# İşleyici havuzlarının iş parçacığı/süreç sayıları
+FAST_LANE_WORKERS = int(os.getenv("FAST_LANE_WORKERS", "8"))
+IO_LANE_WORKERS = int(os.getenv("IO_LANE_WORKERS", "8"))
+CPU_LANE_WORKERS = int(os.getenv("CPU_LANE_WORKERS", str(os.cpu_count() or 2)))
+# Kuyruk bekleme yüzdelikleri için saklanan son ölçüm sayısı
+QUEUE_WAIT_SAMPLES = 1000
 
 # Favori kripto paraları depolamak için dosya adı
 FAVORITES_FILE = 'user_favorites.json'
 # Portföy verilerini saklamak için dosya adı
 PORTFOLIO_FILE = 'user_portfolios.json'
+# Günlük özet aboneliklerini saklamak için dosya adı
+DIGEST_FILE = 'user_digests.json'
+# Günlük portföy değer geçmişini saklamak için dosya adı
+HISTORY_FILE = 'user_history.json'
+# Kriptoların günlük kapanış fiyatlarını saklamak için dosya adı
+DAILY_CLOSE_FILE = 'daily_closes.json'
+# Kullanıcı ayarlarını (tercih edilen para birimi vb.) saklamak için dosya adı
+SETTINGS_FILE = 'user_settings.json'
+
+# Döviz kuru tablosunun yenilenme aralığı (saniye)
+FX_REFRESH_INTERVAL = 600
+# Kullanıcı bir tercih belirtmediğinde kullanılacak görüntüleme para birimi
+DEFAULT_CURRENCY = 'try'
+# Fiyat mesajlarında her zaman gösterilen para birimleri
+PRICE_MESSAGE_CURRENCIES = ['usd', 'eur', 'try']
+
+# Para birimi sembolleri ve mesajlardaki simgeleri
+CURRENCY_SYMBOLS = {
+    'usd': '$',
+    'eur': '€',
+    'try': '₺',
+    'gbp': '£',
+    'jpy': '¥',
+    'cny': '¥',
+    'inr': '₹',
+    'rub': '₽',
+    'krw': '₩'
+}
+CURRENCY_EMOJIS = {
+    'usd': '💵',
+    'eur': '💶',
+    'gbp': '💷',
+    'try': '💷',
+    'jpy': '💴'
+}
+
+# Tek bir toplu fiyat isteğinde sorgulanacak en fazla kripto sayısı
+PRICE_BATCH_SIZE = 250
+# Özet mesajlarının saniyede en fazla gönderim sayısı (Telegram sınırı ~30/sn)
+DIGEST_SEND_RATE = 25
+# Özetleri eşzamanlı gönderen iş parçacığı sayısı; istek gidiş-dönüş süreleri
+# üst üste bindiğinden gönderim hızı gidiş-dönüş süresiyle sınırlı kalmaz
+DIGEST_SENDER_THREADS = 4
+# /digest saatlerinin yorumlandığı saat dilimi (IANA adı, örn: Europe/Istanbul)
+DIGEST_TIMEZONE = os.getenv("DIGEST_TIMEZONE", "Europe/Istanbul")
+
+# Piyasa anlık görüntüsünün yenilenme aralığı (saniye)
+MARKET_SNAPSHOT_INTERVAL = 600
+# Anlık görüntü için sayfa başına kripto sayısı ve çekilecek sayfa sayısı
+MARKET_SNAPSHOT_PER_PAGE = 250
+MARKET_SNAPSHOT_PAGES = 20
+# Sayfa istekleri arasındaki bekleme (saniye); dakikada ~15 istekle ücretsiz API
+# kotasının yarısı diğer komutlara (/price, /top, kurlar, özetler) kalır
+MARKET_SNAPSHOT_PAGE_DELAY = 4
+# Başarısız bir sayfa için yeniden deneme sayısı ve ilk bekleme (her denemede iki katına çıkar)
+MARKET_SNAPSHOT_PAGE_RETRIES = 3
+MARKET_SNAPSHOT_RETRY_DELAY = 15
+
+# /gainers, /losers ve /screen komutlarının varsayılan ve en fazla sonuç sayısı
+# (25 satır Telegram'ın 4096 karakterlik mesaj sınırının altında kalır)
+SCREEN_DEFAULT_LIMIT = 10
+SCREEN_MAX_LIMIT = 25
+# Telegram'ın tek bir mesaj için izin verdiği en fazla karakter sayısı
+TELEGRAM_MESSAGE_LIMIT = 4096
+
+# /screen filtre alanlarının anlık görüntüdeki karşılıkları
+SCREEN_FIELDS = {
+    'mcap': 'market_cap',
+    'change': 'price_change_percentage_24h',
+    'volume': 'total_volume',
+    'price': 'current_price'
+}
+SCREEN_OPERATORS = {
+    '>': operator.gt,
+    '>=': operator.ge,
+    '<': operator.lt,
+    '<=': operator.le
+}
+SCREEN_MULTIPLIERS = {'': 1, 'k': 1e3, 'm': 1e6, 'b': 1e9, 't': 1e12}
+SCREEN_FILTER_PATTERN = re.compile(r'^(mcap|change|volume|price)(>=|<=|>|<)(-?\d+(?:\.\d+)?)([kmbt]?)$')
+
+# /history komutunun varsayılan ve en fazla gün sayısı ile gösterilecek satır sayısı
+HISTORY_DEFAULT_DAYS = 30
+HISTORY_MAX_DAYS = 3650
+HISTORY_DISPLAY_ROWS = 10
+
+# Telegram'ın satır içi sonuçları istemci tarafında saklama süresi (saniye)
+INLINE_CACHE_TIME = 60
+# Art arda yazılan sorguların birleştirilmesi için bekleme süresi (saniye)
+INLINE_DEBOUNCE_SECONDS = 0.4
+# Satır içi sorguda döndürülecek en fazla sonuç sayısı
+INLINE_MAX_RESULTS = 20
+# Sunucu tarafı satır içi sonuç önbelleğinin en fazla kayıt sayısı
+INLINE_RESULT_CACHE_SIZE = 1000
 
 # Kripto kısaltmaları için sözlük - daha dinamik bir çözüm
 CRYPTO_SYMBOLS = {
@@ -60,6 +198,31 @@ def validate_date(date_str: str) -> bool:
     except ValueError:
         return False
 
+def escape_markdown(text: str) -> str:
+    """Metni Telegram Markdown varlıklarının dışında güvenle gösterilecek şekilde kaçışlar."""
+    return re.sub(r'([_*`\[])', r'\\\1', text)
+
+def write_json_store(path: str, data, **dump_options) -> None:
+    """Veriyi store_lock altında serileştirir, dosyaya ise kilidin dışında yazar.
+
+    İçerik önce geçici bir dosyaya yazılıp os.replace ile yerine konur; aynı
+    dosyanın eşzamanlı kayıtlarında daha eski bir içerik yenisinin üzerine yazılmaz.
+    """
+    with store_lock:
+        payload = json.dumps(data, **dump_options)
+        state = store_writes.setdefault(path, {"lock": threading.Lock(), "queued": 0, "written": 0})
+        state["queued"] += 1
+        sequence = state["queued"]
+    
+    with state["lock"]:
+        if sequence < state["written"]:
+            return
+        temp_path = f"{path}.tmp"
+        with open(temp_path, 'w') as f:
+            f.write(payload)
+        os.replace(temp_path, path)
+        state["written"] = sequence
+
 def load_favorites():
     """Kullanıcıların favori kripto paralarını yükler"""
     try:
@@ -74,8 +237,7 @@ def load_favorites():
 def save_favorites(favorites):
     """Kullanıcıların favori kripto paralarını kaydeder"""
     try:
-        with open(FAVORITES_FILE, 'w') as f:
-            json.dump(favorites, f)
+        write_json_store(FAVORITES_FILE, favorites)
     except Exception as e:
         logger.error(f"Favorileri kaydederken hata: {e}")
 
@@ -93,14 +255,398 @@ def load_portfolios():
 def save_portfolios(portfolios):
     """Kullanıcıların portföy verilerini kaydeder"""
     try:
-        with open(PORTFOLIO_FILE, 'w') as f:
-            json.dump(portfolios, f, indent=4)
+        write_json_store(PORTFOLIO_FILE, portfolios, indent=4)
     except Exception as e:
         logger.error(f"Portföyleri kaydederken hata: {e}")
 
-# Favori kripto paraları ve portföyleri yükle
-user_favorites = load_favorites()
-user_portfolios = load_portfolios()
+def load_digests():
+    """Kullanıcıların günlük özet aboneliklerini yükler"""
+    try:
+        if os.path.exists(DIGEST_FILE):
+            with open(DIGEST_FILE, 'r') as f:
+                return json.load(f)
+        return {}
+    except Exception as e:
+        logger.error(f"Özet aboneliklerini yüklerken hata: {e}")
+        return {}
+
+def save_digests(digests):
+    """Kullanıcıların günlük özet aboneliklerini kaydeder"""
+    try:
+        write_json_store(DIGEST_FILE, digests, indent=4)
+    except Exception as e:
+        logger.error(f"Özet aboneliklerini kaydederken hata: {e}")
+
+def load_history():
+    """Kullanıcıların günlük portföy değer geçmişini yükler"""
+    try:
+        if os.path.exists(HISTORY_FILE):
+            with open(HISTORY_FILE, 'r') as f:
+                return json.load(f)
+        return {}
+    except Exception as e:
+        logger.error(f"Portföy geçmişini yüklerken hata: {e}")
+        return {}
+
+def save_history(history):
+    """Kullanıcıların günlük portföy değer geçmişini kaydeder"""
+    try:
+        write_json_store(HISTORY_FILE, history)
+    except Exception as e:
+        logger.error(f"Portföy geçmişini kaydederken hata: {e}")
+
+def load_daily_closes():
+    """Kriptoların önbelleğe alınmış günlük kapanış fiyatlarını yükler"""
+    try:
+        if os.path.exists(DAILY_CLOSE_FILE):
+            with open(DAILY_CLOSE_FILE, 'r') as f:
+                return json.load(f)
+        return {}
+    except Exception as e:
+        logger.error(f"Günlük kapanış fiyatlarını yüklerken hata: {e}")
+        return {}
+
+def save_daily_closes(closes):
+    """Kriptoların günlük kapanış fiyatlarını kaydeder"""
+    try:
+        write_json_store(DAILY_CLOSE_FILE, closes)
+    except Exception as e:
+        logger.error(f"Günlük kapanış fiyatlarını kaydederken hata: {e}")
+
+def load_settings():
+    """Kullanıcı ayarlarını yükler"""
+    try:
+        if os.path.exists(SETTINGS_FILE):
+            with open(SETTINGS_FILE, 'r') as f:
+                return json.load(f)
+        return {}
+    except Exception as e:
+        logger.error(f"Kullanıcı ayarlarını yüklerken hata: {e}")
+        return {}
+
+def save_settings(settings):
+    """Kullanıcı ayarlarını kaydeder"""
+    try:
+        write_json_store(SETTINGS_FILE, settings, indent=4)
+    except Exception as e:
+        logger.error(f"Kullanıcı ayarlarını kaydederken hata: {e}")
+
+def build_digest_index(digests):
+    """Aboneleri gönderim dakikasına (SS:DD) göre gruplar."""
+    index = {}
+    for user_id, subscription in digests.items():
+        index.setdefault(subscription["time"], set()).add(user_id)
+    return index
+
+# Kullanıcı verileri; açılışta load_state() ile arka planda doldurulur
+user_favorites = {}
+user_portfolios = {}
+user_digests = {}
+digest_index = {}
+user_history = {}
+daily_closes = {}
+user_settings = {}
+
+# Bot'un hazır sayılması için tamamlanması gereken bileşenler
+readiness = {
+    "stores": threading.Event(),
+    "fx_rates": threading.Event(),
+    "market_snapshot": threading.Event()
+}
+startup_timeline = []
+
+def mark_startup(stage: str) -> None:
+    """Başlangıç aşamasını açılıştan bu yana geçen süreyle kaydeder."""
+    elapsed_ms = (time.perf_counter() - STARTUP_STARTED) * 1000
+    startup_timeline.append((stage, elapsed_ms))
+    logger.info(f"Başlangıç: {stage} (+{elapsed_ms:.0f} ms)")
+
+def mark_ready(component: str) -> None:
+    """Bileşeni hazır olarak işaretler; tümü hazırsa zaman çizelgesini yazar."""
+    if readiness[component].is_set():
+        return
+    readiness[component].set()
+    mark_startup(f"{component} hazır")
+    
+    if is_ready():
+        timeline = ", ".join(f"{stage}: {elapsed_ms:.0f} ms" for stage, elapsed_ms in startup_timeline)
+        logger.info(f"Bot hazır! Başlangıç zaman çizelgesi: {timeline}")
+
+def is_ready() -> bool:
+    """Veri dosyaları ve önbellekler yüklendiyse True döndürür."""
+    return all(event.is_set() for event in readiness.values())
+
+def load_state() -> None:
+    """Kullanıcı verilerini dosyalardan yükler (açılışta arka planda çalışır).
+
+    Yükleme başarısız olursa süreç sonlandırılır: wait_for_state ile bekleyen
+    güncellemeler aksi halde sonsuza dek takılır, eksik verilerle devam etmek
+    ise ilk kayıtta dosyaların üzerine yazılmasına yol açar.
+    """
+    try:
+        user_favorites.update(load_favorites())
+        user_portfolios.update(load_portfolios())
+        user_digests.update(load_digests())
+        digest_index.update(build_digest_index(user_digests))
+        user_history.update(load_history())
+        daily_closes.update(load_daily_closes())
+        user_settings.update(load_settings())
+    except Exception:
+        logger.exception("Kullanıcı verileri yüklenemedi, bot kapatılıyor")
+        logging.shutdown()
+        os._exit(1)
+    mark_ready("stores")
+
+def wait_for_state(update: Update, context: CallbackContext) -> None:
+    """Veriler yüklenene kadar gelen güncellemelerin işlenmesini bekletir."""
+    readiness["stores"].wait()
+
+def get_cg():
+    """CoinGecko API istemcisini ilk kullanımda oluşturup döndürür."""
+    global cg
+    if cg is None:
+        with cg_lock:
+            if cg is None:
+                from pycoingecko import CoinGeckoAPI
+                cg = CoinGeckoAPI()
+    return cg
+
+def start_health_server() -> None:
+    """/healthz ve /readyz uç noktalarını sunan HTTP sunucusunu arka planda başlatır."""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    
+    class HealthRequestHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == "/healthz":
+                status, body = 200, {"status": "ok"}
+            elif self.path == "/readyz":
+                components = {name: event.is_set() for name, event in readiness.items()}
+                status = 200 if is_ready() else 503
+                body = {"ready": is_ready(), "components": components}
+            elif self.path == "/metrics":
+                status, body = 200, {"lanes": handler_executor.metrics()}
+            else:
+                status, body = 404, {"error": "not found"}
+            
+            payload = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+        
+        def log_message(self, format, *args):
+            # Yoklama isteklerini loglara yazma
+            pass
+    
+    server = ThreadingHTTPServer((HEALTH_HOST, HEALTH_PORT), HealthRequestHandler)
+    threading.Thread(target=server.serve_forever, name="health-server", daemon=True).start()
+
+class LaneMetrics:
+    """Bir havuzun kuyruk bekleme sürelerini ve bekleyen iş sayısını tutar."""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._samples = deque(maxlen=QUEUE_WAIT_SAMPLES)
+        self.pending = 0
+        self.completed = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+    
+    def queued(self) -> None:
+        with self._lock:
+            self.pending += 1
+    
+    def started(self, wait: float) -> None:
+        with self._lock:
+            self.pending -= 1
+            self.completed += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+            self._samples.append(wait)
+    
+    def dropped(self) -> None:
+        with self._lock:
+            self.pending -= 1
+    
+    def snapshot(self) -> dict:
+        with self._lock:
+            samples = sorted(self._samples)
+            # En yakın sıra (nearest-rank) yöntemiyle 95. yüzdelik
+            p95 = samples[max(0, math.ceil(0.95 * len(samples)) - 1)] if samples else 0.0
+            return {
+                "pending": self.pending,
+                "completed": self.completed,
+                "avg_wait_ms": round(self.total_wait / self.completed * 1000, 2) if self.completed else 0.0,
+                "p95_wait_ms": round(p95 * 1000, 2),
+                "max_wait_ms": round(self.max_wait * 1000, 2)
+            }
+
+def run_timed(function, submitted_at: float, *args):
+    """İşlevi çalıştırır ve kuyrukta beklenen süreyle birlikte sonucunu döndürür.
+
+    İşlem havuzunda çalışabilmesi için modül düzeyindedir; süreçler arasında
+    karşılaştırılabilmesi için duvar saati (time.time) kullanılır.
+    """
+    return time.time() - submitted_at, function(*args)
+
+class HandlerExecutor:
+    """Komut işleyicilerini ayrı havuzlarda çalıştırır.
+
+    - fast: önbellekten yanıtlanan hafif komutlar
+    - io: API çağrısı veya dosya yazan komutlar
+    - cpu: büyük portföy hesaplamaları (ayrı süreçler)
+
+    Aynı kullanıcının komutları, hangi havuzda çalışırlarsa çalışsınlar geliş
+    sırasıyla ve birbiri ardına çalıştırılır; böylece örneğin aynı kullanıcının
+    eşzamanlı işlem ekleme/silme komutları user_portfolios üzerinde yarışmaz.
+    İşini submit_cpu ile işlem havuzuna devreden bir komut, sonucu işlenene
+    kadar kullanıcının sırasını tutar ama iş parçacığını bekletmez.
+    """
+    
+    def __init__(self):
+        self._pools = {
+            "fast": ThreadPoolExecutor(FAST_LANE_WORKERS, thread_name_prefix="fast-lane"),
+            "io": ThreadPoolExecutor(IO_LANE_WORKERS, thread_name_prefix="io-lane")
+        }
+        # İşlem havuzu açılışı yavaşlatmaması için bot hazır olduktan sonra
+        # (warm_cpu_pool) ya da ilk kullanımda oluşturulur
+        self._cpu_pool = None
+        self._cpu_lock = threading.Lock()
+        self._metrics = {lane: LaneMetrics() for lane in ("fast", "io", "cpu")}
+        self._user_queues = {}
+        self._user_lock = threading.Lock()
+        # O an çalışan işin kullanıcısı ve işini işlem havuzuna devredip devretmediği
+        self._current = threading.local()
+    
+    def submit(self, lane: str, user_id, function, *args) -> None:
+        """İşlevi havuza gönderir; aynı kullanıcının önceki işi bitene kadar bekletir."""
+        task = (lane, function, args, time.perf_counter())
+        self._metrics[lane].queued()
+        
+        if user_id is not None:
+            with self._user_lock:
+                if user_id in self._user_queues:
+                    self._user_queues[user_id].append(task)
+                    return
+                self._user_queues[user_id] = deque()
+        
+        self._start(task, user_id)
+    
+    def _get_cpu_pool(self) -> ProcessPoolExecutor:
+        with self._cpu_lock:
+            if self._cpu_pool is None:
+                self._cpu_pool = ProcessPoolExecutor(
+                    CPU_LANE_WORKERS,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._cpu_pool
+    
+    def warm_cpu_pool(self) -> None:
+        """İşlem havuzunun süreçlerini önceden başlatır.
+
+        Süreçlerin açılış maliyeti (spawn + modül içe aktarımı) böylece ilk
+        /performance komutuna ve cpu havuzunun bekleme ölçümlerine yansımaz.
+        """
+        pool = self._get_cpu_pool()
+        for future in [pool.submit(os.getpid) for _ in range(CPU_LANE_WORKERS)]:
+            future.result()
+        mark_startup("cpu havuzu hazır")
+    
+    def submit_cpu(self, on_result, on_error, function, *args) -> None:
+        """İşlevi işlem havuzunda çalıştırır ve beklemeden döner.
+
+        Sonuç hazır olduğunda on_result (hata olursa on_error) hızlı havuzda
+        çağrılır. Bir işleyiciden çağrıldığında kullanıcının sıradaki komutu bu
+        geri çağırma bitene kadar bekletilir; çağıran io iş parçacığı ise hemen
+        serbest kalır.
+        """
+        pool = self._get_cpu_pool()
+        user_id = getattr(self._current, "user_id", None)
+        
+        self._metrics["cpu"].queued()
+        try:
+            future = pool.submit(run_timed, function, time.time(), *args)
+        except Exception:
+            self._metrics["cpu"].dropped()
+            raise
+        self._current.deferred = True
+        future.add_done_callback(functools.partial(self._cpu_done, on_result, on_error, user_id))
+    
+    def _cpu_done(self, on_result, on_error, user_id, future) -> None:
+        # İşlem havuzunun yönetici iş parçacığında çalışır; yanıt hızlı havuzda gönderilir
+        try:
+            wait, result = future.result()
+        except Exception as e:
+            self._metrics["cpu"].dropped()
+            task = ("fast", on_error, (e,), time.perf_counter())
+        else:
+            self._metrics["cpu"].started(wait)
+            task = ("fast", on_result, (result,), time.perf_counter())
+        
+        self._metrics["fast"].queued()
+        self._start(task, user_id)
+    
+    def metrics(self) -> dict:
+        """Her havuzun kuyruk bekleme ölçümlerini döndürür."""
+        return {lane: metrics.snapshot() for lane, metrics in self._metrics.items()}
+    
+    def shutdown(self) -> None:
+        for pool in self._pools.values():
+            pool.shutdown(wait=True)
+        if self._cpu_pool is not None:
+            self._cpu_pool.shutdown(wait=True)
+    
+    def _start(self, task, user_id) -> None:
+        self._pools[task[0]].submit(self._run, task, user_id)
+    
+    def _run(self, task, user_id) -> None:
+        lane, function, args, submitted_at = task
+        self._metrics[lane].started(time.perf_counter() - submitted_at)
+        self._current.user_id = user_id
+        self._current.deferred = False
+        try:
+            function(*args)
+        except Exception as e:
+            logger.error(f"{lane} havuzunda çalışan işlevde hata: {e}")
+        finally:
+            # İşini işlem havuzuna devreden işin sırası, sonucu işlenince bırakılır
+            deferred = self._current.deferred
+            self._current.user_id = None
+            self._current.deferred = False
+            if user_id is not None and not deferred:
+                self._start_next(user_id)
+    
+    def _start_next(self, user_id) -> None:
+        with self._user_lock:
+            pending = self._user_queues[user_id]
+            if not pending:
+                del self._user_queues[user_id]
+                return
+            task = pending.popleft()
+        self._start(task, user_id)
+
+handler_executor = HandlerExecutor()
+
+def run_in_lane(lane: str, callback, serialize: bool = True):
+    """İşleyiciyi belirtilen havuzda, kullanıcı başına sıralı çalışacak şekilde sarar.
+
+    Dispatcher iş parçacığı hemen serbest kalır; işleyicideki hatalar bot'un
+    hata işleyicisine iletilir. serialize=False olan işleyiciler kullanıcının
+    diğer komutlarının bitmesini beklemez.
+    """
+    def dispatch(update: Update, context: CallbackContext) -> None:
+        try:
+            callback(update, context)
+        except Exception as e:
+            context.dispatcher.dispatch_error(update, e)
+    
+    @functools.wraps(callback)
+    def handler(update: Update, context: CallbackContext) -> None:
+        user_id = update.effective_user.id if serialize and update.effective_user else None
+        handler_executor.submit(lane, user_id, dispatch, update, context)
+    
+    return handler
 
 def start(update: Update, context: CallbackContext) -> None:
     """Başlangıç komutunu işler."""
@@ -110,6 +656,8 @@ def start(update: Update, context: CallbackContext) -> None:
         f'Kullanılabilir komutlar:\n'
         f'/price [kripto_kodu] - Kripto fiyatlarını gösterir (örn: /price btc)\n'
         f'/top - En büyük 10 kriptoyu listeler\n'
+        f'/gainers, /losers - 24 saatin en çok yükselen/düşen kriptolarını listeler\n'
+        f'/screen [filtreler] - Kriptoları filtrelere göre tarar\n'
         f'/add [kripto_kodu] - Kripto parayı favorilere ekler (örn: /add sol)\n'
         f'/favorites - Favori kripto paralarınızı listeler\n'
         f'/remove [kripto_kodu] - Kripto parayı favorilerden kaldırır (örn: /remove sol)\n'
@@ -117,6 +665,9 @@ def start(update: Update, context: CallbackContext) -> None:
         f'/add_transaction - Portföyünüze işlem eklemenizi sağlar\n'
         f'/performance - Portföyünüzün performansını gösterir\n'
         f'/list_transactions - Tüm işlemlerinizi listeler\n'
+        f'/history [gün] - Portföyünüzün günlük değer geçmişini gösterir (örn: /history 90d)\n'
+        f'/digest [SS:DD] - Her gün belirtilen saatte portföy özeti gönderir\n'
+        f'/currency [para_birimi] - Görüntüleme para biriminizi ayarlar (örn: /currency eur)\n'
         f'/help - Tüm komutları gösterir'
     )
 
@@ -129,6 +680,11 @@ def help_command(update: Update, context: CallbackContext) -> None:
         'Örnek: /price btc, /price eth veya /price btc eth\n\n'
         '/top - Piyasa değerine göre en büyük 10 kripto parayı listeler\n\n'
         '/list - Popüler kripto paraların listesini gösterir\n\n'
+        '/gainers [sayı] - 24 saatte en çok yükselen kriptoları listeler\n\n'
+        '/losers [sayı] - 24 saatte en çok düşen kriptoları listeler\n\n'
+        '/screen [filtreler] - Kriptoları piyasa değeri, değişim ve hacme göre tarar\n'
+        'Örnek: /screen mcap>1b change>5 volume>10m sort=change\n\n'
+        'Herhangi bir sohbette @bot_adı btc yazarak da fiyat sorgulayabilirsiniz.\n\n'
         '*Favori Komutları:*\n'
         '/add [kripto_kodu] - Kripto parayı favorilerinize ekler\n'
         'Örnek: /add sol\n\n'
@@ -142,10 +698,105 @@ def help_command(update: Update, context: CallbackContext) -> None:
         '/performance - Portföyünüzün performansını ve kar/zarar durumunu gösterir\n\n'
         '/list_transactions - Tüm işlemlerinizi listeler\n\n'
         '/delete_transaction [kripto_kodu] [işlem_no] - Belirtilen işlemi siler\n'
-        'Örnek: /delete_transaction btc 1',
-        parse_mode=ParseMode.MARKDOWN
+        'Örnek: /delete_transaction btc 1\n\n'
+        '/history [gün] - Portföyünüzün günlük değer geçmişini gösterir\n'
+        'Örnek: /history 90d\n\n'
+        '*Ayar Komutları:*\n'
+        '/currency [para_birimi] - Fiyat ve portföy değerlerinin gösterileceği para birimini ayarlar\n'
+        'Örnek: /currency eur\n\n'
+        '*Özet Komutları:*\n'
+        '/digest [SS:DD] - Her gün belirtilen saatte portföy özetinizi gönderir\n'
+        'Örnek: /digest 09:00 (kapatmak için: /digest off)',
+        parse_mode=PARSE_MODE_MARKDOWN
     )
 
+# USD -> para birimi kurları; yenilendiğinde bütünüyle yenisiyle değiştirilir
+fx_rates = {"rates": {}, "updated_at": None}
+
+def refresh_fx_rates(context: CallbackContext = None) -> None:
+    """CoinGecko döviz kurlarından USD bazlı kur tablosunu yeniler.
+
+    CoinGecko kurları BTC bazlı verir; her para birimi USD kuruna bölünerek
+    1 USD'nin karşılığına dönüştürülür.
+    """
+    global fx_rates
+    try:
+        rates = get_cg().get_exchange_rates()["rates"]
+        usd_value = rates["usd"]["value"]
+        fx_rates = {
+            "rates": {
+                currency: info["value"] / usd_value
+                for currency, info in rates.items()
+                if info["type"] == "fiat"
+            },
+            "updated_at": datetime.now()
+        }
+        logger.info(f"Döviz kurları yenilendi ({len(fx_rates['rates'])} para birimi)")
+        mark_ready("fx_rates")
+    except Exception as e:
+        logger.error(f"Döviz kurları yenilenirken hata: {e}")
+
+def get_fx_rate(currency: str):
+    """1 USD'nin belirtilen para birimindeki karşılığını döndürür (bilinmiyorsa None).
+
+    Yalnızca önbellekteki tabloyu okur; tablo yalnızca zamanlanmış refresh_fx_rates
+    işiyle yenilenir, böylece kurlar alınamazken istekler ek API çağrısı yapmaz.
+    """
+    if currency == 'usd':
+        return 1.0
+    return fx_rates["rates"].get(currency)
+
+def convert_usd(amount: float, currency: str):
+    """USD tutarını yerel olarak belirtilen para birimine çevirir (kur yoksa None)."""
+    rate = get_fx_rate(currency)
+    return amount * rate if rate is not None else None
+
+def format_money(amount: float, currency: str) -> str:
+    """Tutarı para birimi simgesiyle biçimlendirir."""
+    symbol = CURRENCY_SYMBOLS.get(currency)
+    if symbol:
+        return f"{symbol}{amount:,.2f}"
+    return f"{amount:,.2f} {currency.upper()}"
+
+def format_local_suffix(amount_usd: float, currency: str, fx_rate) -> str:
+    """Görüntüleme para birimi USD değilse tutarın yerel karşılığını parantez içinde döndürür."""
+    if currency == 'usd' or fx_rate is None:
+        return ""
+    return f" ({format_money(amount_usd * fx_rate, currency)})"
+
+def get_user_currency(user_id: str) -> str:
+    """Kullanıcının tercih ettiği görüntüleme para birimini döndürür."""
+    return user_settings.get(user_id, {}).get("currency", DEFAULT_CURRENCY)
+
+def currency_command(update: Update, context: CallbackContext) -> None:
+    """Kullanıcının tercih ettiği görüntüleme para birimini gösterir veya değiştirir."""
+    user_id = str(update.effective_user.id)
+    
+    if not context.args:
+        currencies = ", ".join(sorted(fx_rates["rates"])) or ", ".join(CURRENCY_SYMBOLS)
+        update.message.reply_text(
+            f"Görüntüleme para biriminiz: {get_user_currency(user_id).upper()}\n\n"
+            f"Değiştirmek için: /currency [para_birimi] (örn: /currency eur)\n"
+            f"Desteklenen para birimleri: {currencies}"
+        )
+        return
+    
+    currency = context.args[0].lower()
+    
+    if currency != 'usd' and not fx_rates["rates"]:
+        update.message.reply_text("Döviz kurları henüz yüklenmedi. Lütfen biraz sonra tekrar deneyin.")
+        return
+    
+    if get_fx_rate(currency) is None:
+        update.message.reply_text(f"Desteklenmeyen para birimi: {currency.upper()}")
+        return
+    
+    with store_lock:
+        user_settings.setdefault(user_id, {})["currency"] = currency
+    save_settings(user_settings)
+    
+    update.message.reply_text(f"Görüntüleme para biriminiz {currency.upper()} olarak ayarlandı! ✅")
+
 def get_crypto_price(crypto_id: str) -> dict:
     """Belirtilen kripto paranın fiyat bilgisini döndürür."""
     try:
@@ -153,9 +804,9 @@ def get_crypto_price(crypto_id: str) -> dict:
         crypto_id = convert_crypto_symbol(crypto_id)
         
         # CoinGecko API'den kripto para bilgilerini al
-        price_data = cg.get_price(
+        price_data = get_cg().get_price(
             ids=crypto_id, 
-            vs_currencies=['usd', 'eur', 'try'], 
+            vs_currencies='usd', 
             include_market_cap=True,
             include_24hr_change=True
         )
@@ -171,8 +822,35 @@ def get_crypto_price(crypto_id: str) -> dict:
         logger.error(f"Kripto veri alırken hata: {e}")
         return {"error": f"Veri alınırken bir hata oluştu: {str(e)}"}
 
-def format_price_message(crypto_data: dict) -> str:
-    """Kripto para verilerini okunabilir bir mesaja dönüştürür."""
+def get_crypto_prices(crypto_ids) -> dict:
+    """Birden fazla kripto paranın fiyatını toplu isteklerle döndürür.
+
+    Her kripto için ayrı istek atmak yerine kimlikler PRICE_BATCH_SIZE'lık
+    gruplar halinde tek bir get_price çağrısıyla sorgulanır.
+    """
+    crypto_ids = sorted({convert_crypto_symbol(crypto_id) for crypto_id in crypto_ids})
+    prices = {}
+    
+    for i in range(0, len(crypto_ids), PRICE_BATCH_SIZE):
+        batch = crypto_ids[i:i + PRICE_BATCH_SIZE]
+        try:
+            price_data = get_cg().get_price(
+                ids=batch,
+                vs_currencies='usd',
+                include_24hr_change=True
+            )
+            prices.update(price_data or {})
+        except Exception as e:
+            logger.error(f"Toplu fiyat verisi alırken hata: {e}")
+    
+    return prices
+
+def format_price_message(crypto_data: dict, currency: str = DEFAULT_CURRENCY) -> str:
+    """Kripto para verilerini okunabilir bir mesaja dönüştürür.
+
+    Fiyat yalnızca USD olarak alınır; diğer para birimleri kur tablosundan
+    yerel olarak hesaplanır.
+    """
     if "error" in crypto_data:
         return crypto_data["error"]
     
@@ -184,20 +862,17 @@ def format_price_message(crypto_data: dict) -> str:
     
     message = f"*{crypto_name}* Fiyat Bilgisi:\n\n"
     
-    # USD fiyatı
+    # USD fiyatı ve ondan türetilen diğer para birimleri
     if "usd" in data:
         usd_price = data["usd"]
-        message += f"💵 *USD*: ${usd_price:,.2f}\n"
-    
-    # EUR fiyatı
-    if "eur" in data:
-        eur_price = data["eur"]
-        message += f"💶 *EUR*: €{eur_price:,.2f}\n"
-    
-    # TRY fiyatı
-    if "try" in data:
-        try_price = data["try"]
-        message += f"💷 *TRY*: ₺{try_price:,.2f}\n"
+        currencies = PRICE_MESSAGE_CURRENCIES + ([currency] if currency not in PRICE_MESSAGE_CURRENCIES else [])
+        
+        for display_currency in currencies:
+            price = convert_usd(usd_price, display_currency)
+            if price is None:
+                continue
+            emoji = CURRENCY_EMOJIS.get(display_currency, "💰")
+            message += f"{emoji} *{display_currency.upper()}*: {format_money(price, display_currency)}\n"
     
     # 24 saatlik değişim
     if "usd_24h_change" in data:
@@ -223,17 +898,18 @@ def price_command(update: Update, context: CallbackContext) -> None:
     
     # Tüm argümanları al ve her biri için fiyat sorgulama yap
     crypto_ids = [arg.lower() for arg in context.args]
+    currency = get_user_currency(str(update.effective_user.id))
     
     for crypto_id in crypto_ids:
         crypto_data = get_crypto_price(crypto_id)
-        message = format_price_message(crypto_data)
-        update.message.reply_text(message, parse_mode=ParseMode.MARKDOWN)
+        message = format_price_message(crypto_data, currency)
+        update.message.reply_text(message, parse_mode=PARSE_MODE_MARKDOWN)
 
 def list_command(update: Update, context: CallbackContext) -> None:
     """Popüler kripto paraları listeler."""
     try:
         # CoinGecko API'den popüler kripto paraları al
-        top_coins = cg.get_coins_markets(
+        top_coins = get_cg().get_coins_markets(
             vs_currency='usd',
             order='market_cap_desc',
             per_page=10,
@@ -251,7 +927,7 @@ def list_command(update: Update, context: CallbackContext) -> None:
             message += f"   💵 ${price:,.2f} | {emoji} %{change_24h:.2f}\n"
             message += f"   `/price {coin['id']}`\n\n"
         
-        update.message.reply_text(message, parse_mode=ParseMode.MARKDOWN)
+        update.message.reply_text(message, parse_mode=PARSE_MODE_MARKDOWN)
     except Exception as e:
         logger.error(f"Popüler kriptoları listelerken hata: {e}")
         update.message.reply_text(f"Popüler kripto paraları listelerken bir hata oluştu: {str(e)}")
@@ -260,7 +936,7 @@ def top_command(update: Update, context: CallbackContext) -> None:
     """En büyük 10 kriptoyu listeler. (list_command ile aynı işlevi görür)"""
     try:
         # CoinGecko API'den popüler kripto paraları al
-        top_coins = cg.get_coins_markets(
+        top_coins = get_cg().get_coins_markets(
             vs_currency='usd',
             order='market_cap_desc',
             per_page=10,
@@ -280,11 +956,402 @@ def top_command(update: Update, context: CallbackContext) -> None:
             message += f"   📊 Piyasa Değeri: ${market_cap:,.0f}\n"
             message += f"   Kod: `/price {coin['id']}`\n\n"
         
-        update.message.reply_text(message, parse_mode=ParseMode.MARKDOWN)
+        update.message.reply_text(message, parse_mode=PARSE_MODE_MARKDOWN)
     except Exception as e:
         logger.error(f"En büyük kriptoları listelerken hata: {e}")
         update.message.reply_text(f"En büyük kripto paraları listelerken bir hata oluştu: {str(e)}")
 
+# En son piyasa anlık görüntüsü; yenilendiğinde bütünüyle yenisiyle değiştirilir
+market_snapshot = {
+    "coins": [],
+    "by_id": {},
+    "index": {},
+    "index_keys": [],
+    "by_change": [],
+    "by_market_cap": [],
+    "market_cap_keys": [],
+    "updated_at": None,
+    "version": 0
+}
+
+def build_coin_index(coins: list) -> dict:
+    """Sembol, kimlik ve isimden kripto kimliklerine giden arama dizinini oluşturur."""
+    index = {}
+    for coin in coins:
+        for key in (coin["symbol"], coin["id"], coin["name"]):
+            ids = index.setdefault(key.lower(), [])
+            if coin["id"] not in ids:
+                ids.append(coin["id"])
+    
+    # Kısaltma sözlüğündeki semboller her zaman doğru kriptoyu göstersin
+    for symbol, crypto_id in CRYPTO_SYMBOLS.items():
+        ids = index.setdefault(symbol, [])
+        if crypto_id in ids:
+            ids.remove(crypto_id)
+        ids.insert(0, crypto_id)
+    
+    return index
+
+def fetch_market_page(page: int) -> list:
+    """Piyasa listesinin bir sayfasını çeker; hata olursa artan beklemeyle yeniden dener."""
+    for attempt in range(MARKET_SNAPSHOT_PAGE_RETRIES + 1):
+        try:
+            return get_cg().get_coins_markets(
+                vs_currency='usd',
+                order='market_cap_desc',
+                per_page=MARKET_SNAPSHOT_PER_PAGE,
+                page=page
+            )
+        except Exception as e:
+            if attempt == MARKET_SNAPSHOT_PAGE_RETRIES:
+                raise
+            delay = MARKET_SNAPSHOT_RETRY_DELAY * 2 ** attempt
+            logger.warning(f"Piyasa sayfası {page} alınamadı ({e}), {delay} sn sonra yeniden denenecek")
+            time.sleep(delay)
+
+def fetch_market_coins(on_page=None) -> tuple:
+    """CoinGecko'dan piyasa verisini sayfa sayfa çeker.
+
+    Bir sayfa tüm denemelere rağmen alınamazsa o ana kadar çekilen sayfalar
+    döndürülür; ikinci değer listenin tam olup olmadığını belirtir. on_page
+    verilirse, ardından başka sayfa gelecek her sayfada o ana kadar çekilen
+    kriptolarla çağrılır.
+    """
+    coins = []
+    for page in range(1, MARKET_SNAPSHOT_PAGES + 1):
+        try:
+            page_coins = fetch_market_page(page)
+        except Exception as e:
+            logger.error(f"Piyasa sayfası {page} alınamadı, kısmi veri kullanılacak: {e}")
+            return coins, False
+        
+        coins.extend(page_coins)
+        if len(page_coins) < MARKET_SNAPSHOT_PER_PAGE:
+            break
+        if on_page and page < MARKET_SNAPSHOT_PAGES:
+            on_page(coins)
+        time.sleep(MARKET_SNAPSHOT_PAGE_DELAY)
+    
+    return coins, True
+
+def build_market_snapshot(coins: list) -> dict:
+    """Kripto listesinden arama ve sıralama dizinleriyle yeni bir anlık görüntü oluşturur."""
+    index = build_coin_index(coins)
+    
+    # Sorguların anında yanıtlanabilmesi için önceden sıralanmış dizinler
+    by_change = sorted(
+        (coin for coin in coins if coin["price_change_percentage_24h"] is not None),
+        key=lambda coin: coin["price_change_percentage_24h"]
+    )
+    by_market_cap = sorted(
+        (coin for coin in coins if coin["market_cap"]),
+        key=lambda coin: coin["market_cap"]
+    )
+    
+    return {
+        "coins": coins,
+        "by_id": {coin["id"]: coin for coin in coins},
+        "index": index,
+        "index_keys": sorted(index),
+        "by_change": by_change,
+        "by_market_cap": by_market_cap,
+        "market_cap_keys": [coin["market_cap"] for coin in by_market_cap],
+        "updated_at": datetime.now(),
+        "version": market_snapshot["version"] + 1
+    }
+
+def publish_partial_snapshot(coins: list) -> None:
+    """Çekilen kriptoları, henüz çekilmemiş olanları önceki anlık görüntüden alarak yayımlar."""
+    global market_snapshot
+    fetched_ids = {coin["id"] for coin in coins}
+    coins = coins + [coin for coin in market_snapshot["coins"] if coin["id"] not in fetched_ids]
+    market_snapshot = build_market_snapshot(coins)
+    mark_ready("market_snapshot")
+
+def refresh_market_snapshot(context: CallbackContext) -> None:
+    """Piyasa anlık görüntüsünü periyodik olarak yeniler.
+
+    Anlık görüntü her sayfadan sonra yayımlanır; böylece açılışta bot, tüm
+    sayfaların çekilmesini beklemeden ilk sayfayla hazır olur. Henüz çekilmemiş
+    ya da yenileme yarıda kaldığı için alınamamış kriptolar önceki anlık
+    görüntüden tamamlanır; hiç sayfa alınamazsa önceki görüntü korunur.
+    """
+    global market_snapshot
+    try:
+        coins, complete = fetch_market_coins(on_page=publish_partial_snapshot)
+        if not coins:
+            logger.error("Piyasa verisi alınamadı, önceki anlık görüntü kullanılmaya devam ediyor")
+            return
+        
+        if complete:
+            market_snapshot = build_market_snapshot(coins)
+        else:
+            publish_partial_snapshot(coins)
+        logger.info(
+            f"Piyasa anlık görüntüsü {'yenilendi' if complete else 'kısmen yenilendi'} "
+            f"({len(market_snapshot['coins'])} kripto)"
+        )
+        mark_ready("market_snapshot")
+    except Exception as e:
+        logger.error(f"Piyasa anlık görüntüsü yenilenirken hata: {e}")
+
+def search_coins(query: str, snapshot: dict, limit: int = INLINE_MAX_RESULTS) -> list:
+    """Anlık görüntüdeki kriptoları sembol, kimlik veya isim önekine göre arar."""
+    if not query:
+        return snapshot["coins"][:limit]
+    
+    index = snapshot["index"]
+    keys = snapshot["index_keys"]
+    by_id = snapshot["by_id"]
+    
+    # Tam eşleşmeler önce, ardından önek eşleşmeleri piyasa değeri sırasıyla
+    exact_ids = [crypto_id for crypto_id in index.get(query, []) if crypto_id in by_id]
+    prefix_ids = set()
+    position = bisect_left(keys, query)
+    while position < len(keys) and keys[position].startswith(query):
+        prefix_ids.update(index[keys[position]])
+        position += 1
+    
+    prefix_ids = [crypto_id for crypto_id in prefix_ids if crypto_id in by_id and crypto_id not in exact_ids]
+    prefix_ids.sort(key=lambda crypto_id: by_id[crypto_id]["market_cap_rank"] or float("inf"))
+    
+    return [by_id[crypto_id] for crypto_id in (exact_ids + prefix_ids)[:limit]]
+
+def format_market_coin_message(coin: dict) -> str:
+    """Anlık görüntüdeki bir kriptoyu okunabilir bir mesaja dönüştürür."""
+    price = coin["current_price"] or 0
+    change_24h = coin["price_change_percentage_24h"] or 0
+    market_cap = coin["market_cap"] or 0
+    emoji = "🟢" if change_24h > 0 else "🔴"
+    
+    # İsim ve sembol dış kaynaklı olduğundan kalın yazı dışında, kaçışlanarak eklenir
+    message = f"{escape_markdown(coin['name'])} ({escape_markdown(coin['symbol'].upper())}) *Fiyat Bilgisi:*\n\n"
+    message += f"💵 *USD*: ${price:,.2f}\n"
+    message += f"{emoji} *24s Değişim*: %{change_24h:.2f}\n"
+    message += f"📊 *Piyasa Değeri*: ${market_cap:,.0f}\n"
+    return message
+
+# Normalleştirilmiş sorgu -> (anlık görüntü sürümü, sonuçlar)
+inline_result_cache = {}
+# Kullanıcı başına bekleyen satır içi yanıt işi (debounce için)
+inline_pending_answers = {}
+inline_pending_lock = threading.Lock()
+
+def normalize_inline_query(query: str) -> str:
+    """Satır içi sorguyu önbellek anahtarı olarak kullanılabilecek biçime getirir."""
+    return " ".join(query.lower().split())
+
+def get_inline_results(query: str) -> list:
+    """Sorgunun satır içi sonuçlarını önbellekten ya da anlık görüntüden döndürür."""
+    from telegram import InlineQueryResultArticle, InputTextMessageContent
+    
+    snapshot = market_snapshot
+    cached = inline_result_cache.get(query)
+    if cached and cached[0] == snapshot["version"]:
+        return cached[1]
+    
+    results = [
+        InlineQueryResultArticle(
+            id=coin["id"],
+            title=f"{coin['name']} ({coin['symbol'].upper()})",
+            description=f"${(coin['current_price'] or 0):,.2f} | %{(coin['price_change_percentage_24h'] or 0):.2f}",
+            input_message_content=InputTextMessageContent(
+                format_market_coin_message(coin),
+                parse_mode=PARSE_MODE_MARKDOWN
+            )
+        )
+        for coin in search_coins(query, snapshot)
+    ]
+    
+    if len(inline_result_cache) >= INLINE_RESULT_CACHE_SIZE:
+        inline_result_cache.clear()
+    inline_result_cache[query] = (snapshot["version"], results)
+    return results
+
+def answer_inline_query(inline_query) -> None:
+    """Satır içi sorguyu yerel anlık görüntüden yanıtlar."""
+    results = get_inline_results(normalize_inline_query(inline_query.query))
+    inline_query.answer(results, cache_time=INLINE_CACHE_TIME)
+
+def send_inline_answer(context: CallbackContext) -> None:
+    """Debounce süresi dolan sorgunun yanıtını hızlı havuza gönderir."""
+    inline_query = context.job.context
+    with inline_pending_lock:
+        if inline_pending_answers.get(inline_query.from_user.id) is context.job:
+            del inline_pending_answers[inline_query.from_user.id]
+    handler_executor.submit("fast", None, answer_inline_query, inline_query)
+
+def inline_query_handler(update: Update, context: CallbackContext) -> None:
+    """Satır içi sorguları (@bot btc) kısa bir debounce süresinden sonra yanıtlar.
+
+    Hiçbir iş parçacığı beklemez: her sorgu için zamanlanmış bir yanıt işi
+    kurulur ve aynı kullanıcıdan yeni sorgu gelirse önceki iş iptal edilir.
+    """
+    inline_query = update.inline_query
+    user_id = inline_query.from_user.id
+    
+    with inline_pending_lock:
+        previous = inline_pending_answers.get(user_id)
+        if previous is not None:
+            previous.schedule_removal()
+        inline_pending_answers[user_id] = context.job_queue.run_once(
+            send_inline_answer, INLINE_DEBOUNCE_SECONDS, context=inline_query
+        )
+
+def parse_screen_limit(args: list) -> int:
+    """Komut argümanlarından sonuç sayısını okur."""
+    if args and args[0].isdigit():
+        return max(1, min(int(args[0]), SCREEN_MAX_LIMIT))
+    return SCREEN_DEFAULT_LIMIT
+
+def parse_screen_number(value: str, suffix: str) -> float:
+    """'1.5' ve 'b' gibi değerleri sayıya dönüştürür (1.5b -> 1500000000)."""
+    return float(value) * SCREEN_MULTIPLIERS[suffix]
+
+def format_coin_list(title: str, coins: list) -> str:
+    """Anlık görüntüdeki kriptoları numaralı bir liste mesajına dönüştürür.
+
+    Mesaj Telegram'ın karakter sınırını aşacaksa kalan satırlar eklenmez.
+    """
+    message = f"*{title}*\n\n"
+    
+    for i, coin in enumerate(coins, 1):
+        price = coin["current_price"] or 0
+        change_24h = coin["price_change_percentage_24h"] or 0
+        volume = coin["total_volume"] or 0
+        emoji = "🟢" if change_24h > 0 else "🔴"
+        
+        # İsim ve sembol dış kaynaklı olduğundan kalın yazı dışında, kaçışlanarak eklenir
+        entry = f"{i}. {escape_markdown(coin['name'])} ({escape_markdown(coin['symbol'].upper())})\n"
+        entry += f"   💵 ${price:,.6g} | {emoji} %{change_24h:.2f}\n"
+        entry += f"   📊 Piyasa Değeri: ${(coin['market_cap'] or 0):,.0f} | Hacim: ${volume:,.0f}\n\n"
+        
+        if len(message) + len(entry) > TELEGRAM_MESSAGE_LIMIT:
+            break
+        message += entry
+    
+    return message
+
+def screen_coins(snapshot: dict, filters: list, sort_field: str, ascending: bool, limit: int) -> list:
+    """Anlık görüntüyü filtreler ve sıralama alanına göre ilk k kriptoyu döndürür.
+
+    Piyasa değeri aralığı önceden sıralanmış dizinde ikili arama ile daraltılır,
+    kalan adaylar arasından ilk k sonuç yığın (heap) ile seçilir.
+    """
+    candidates = snapshot["coins"]
+    
+    mcap_bounds = [(op, value) for field, op, value in filters if field == "market_cap"]
+    if mcap_bounds:
+        keys = snapshot["market_cap_keys"]
+        low = max((value for op, value in mcap_bounds if op in ('>', '>=')), default=None)
+        high = min((value for op, value in mcap_bounds if op in ('<', '<=')), default=None)
+        start = bisect_left(keys, low) if low is not None else 0
+        end = bisect_right(keys, high) if high is not None else len(keys)
+        candidates = snapshot["by_market_cap"][start:end]
+    
+    def matches(coin):
+        for field, op, value in filters:
+            if coin[field] is None or not SCREEN_OPERATORS[op](coin[field], value):
+                return False
+        return coin[sort_field] is not None
+    
+    select = heapq.nsmallest if ascending else heapq.nlargest
+    return select(limit, filter(matches, candidates), key=lambda coin: coin[sort_field])
+
+def market_snapshot_ready(update: Update) -> bool:
+    """Anlık görüntü henüz oluşmadıysa kullanıcıyı bilgilendirir."""
+    if market_snapshot["coins"]:
+        return True
+    update.message.reply_text("Piyasa verisi henüz hazır değil. Lütfen biraz sonra tekrar deneyin.")
+    return False
+
+def gainers_command(update: Update, context: CallbackContext) -> None:
+    """Son 24 saatte en çok yükselen kriptoları listeler."""
+    if not market_snapshot_ready(update):
+        return
+    
+    limit = parse_screen_limit(context.args)
+    coins = market_snapshot["by_change"][-limit:][::-1]
+    update.message.reply_text(
+        format_coin_list(f"🚀 24 Saatin En Çok Yükselen {limit} Kriptosu:", coins),
+        parse_mode=PARSE_MODE_MARKDOWN
+    )
+
+def losers_command(update: Update, context: CallbackContext) -> None:
+    """Son 24 saatte en çok düşen kriptoları listeler."""
+    if not market_snapshot_ready(update):
+        return
+    
+    limit = parse_screen_limit(context.args)
+    coins = market_snapshot["by_change"][:limit]
+    update.message.reply_text(
+        format_coin_list(f"📉 24 Saatin En Çok Düşen {limit} Kriptosu:", coins),
+        parse_mode=PARSE_MODE_MARKDOWN
+    )
+
+def screen_command(update: Update, context: CallbackContext) -> None:
+    """Kriptoları piyasa değeri, 24s değişim, hacim ve fiyat filtrelerine göre tarar."""
+    if not context.args:
+        update.message.reply_text(
+            "Lütfen en az bir filtre belirtin:\n\n"
+            "/screen [filtreler] [sort=alan] [limit=sayı]\n\n"
+            "Örnek:\n"
+            "/screen mcap>1b mcap<10b change>5 volume>10m sort=change limit=20\n\n"
+            "Alanlar: mcap, change, volume, price\n"
+            "Operatörler: >, >=, <, <=\n"
+            "Birimler: k (bin), m (milyon), b (milyar), t (trilyon)\n"
+            "Artan sıralama için alanın başına - ekleyin (örn: sort=-change)"
+        )
+        return
+    
+    if not market_snapshot_ready(update):
+        return
+    
+    filters = []
+    sort_field = "market_cap"
+    ascending = False
+    limit = SCREEN_DEFAULT_LIMIT
+    
+    for arg in context.args:
+        arg = arg.lower()
+        
+        if arg.startswith("sort="):
+            field = arg[len("sort="):]
+            ascending = field.startswith("-")
+            field = field.lstrip("-")
+            if field not in SCREEN_FIELDS:
+                update.message.reply_text(f"Geçersiz sıralama alanı: {field}")
+                return
+            sort_field = SCREEN_FIELDS[field]
+            continue
+        
+        if arg.startswith("limit="):
+            value = arg[len("limit="):]
+            if not value.isdigit():
+                update.message.reply_text(f"Geçersiz sonuç sayısı: {value}")
+                return
+            limit = max(1, min(int(value), SCREEN_MAX_LIMIT))
+            continue
+        
+        match = SCREEN_FILTER_PATTERN.match(arg)
+        if not match:
+            update.message.reply_text(f"Geçersiz filtre: {arg}\nÖrnek: mcap>1b, change>5, volume>10m")
+            return
+        
+        field, op, value, suffix = match.groups()
+        filters.append((SCREEN_FIELDS[field], op, parse_screen_number(value, suffix)))
+    
+    coins = screen_coins(market_snapshot, filters, sort_field, ascending, limit)
+    
+    if not coins:
+        update.message.reply_text("Filtrelere uyan kripto para bulunamadı.")
+        return
+    
+    update.message.reply_text(
+        format_coin_list(f"🔍 Tarama Sonuçları ({len(coins)} kripto):", coins),
+        parse_mode=PARSE_MODE_MARKDOWN
+    )
+
 def add_favorite(update: Update, context: CallbackContext) -> None:
     """Kripto parayı kullanıcının favorilerine ekler."""
     if not context.args:
@@ -308,17 +1375,14 @@ def add_favorite(update: Update, context: CallbackContext) -> None:
         
         user_id = str(update.effective_user.id)
         
-        # Kullanıcının favori listesini al veya oluştur
-        if user_id not in user_favorites:
-            user_favorites[user_id] = []
-        
         # Zaten favorilerde var mı kontrol et
-        if crypto_id in user_favorites[user_id]:
+        if crypto_id in user_favorites.get(user_id, []):
             update.message.reply_text(f"{crypto_id.capitalize()} zaten favorilerinizde!")
             return
         
-        # Favorilere ekle
-        user_favorites[user_id].append(crypto_id)
+        # Favorilere ekle (kullanıcının listesi yoksa oluştur)
+        with store_lock:
+            user_favorites.setdefault(user_id, []).append(crypto_id)
         save_favorites(user_favorites)
         
         update.message.reply_text(f"{crypto_id.capitalize()} favorilerinize eklendi! 📌")
@@ -348,7 +1412,8 @@ def remove_favorite(update: Update, context: CallbackContext) -> None:
         return
     
     # Favorilerden kaldır
-    user_favorites[user_id].remove(crypto_id)
+    with store_lock:
+        user_favorites[user_id].remove(crypto_id)
     save_favorites(user_favorites)
     
     update.message.reply_text(f"{crypto_id.capitalize()} favorilerinizden kaldırıldı! ✅")
@@ -377,7 +1442,7 @@ def show_favorites(update: Update, context: CallbackContext) -> None:
         else:
             message += f"*{crypto_id.capitalize()}*: Veri alınamadı\n\n"
     
-    update.message.reply_text(message, parse_mode=ParseMode.MARKDOWN)
+    update.message.reply_text(message, parse_mode=PARSE_MODE_MARKDOWN)
 
 def error_handler(update: Update, context: CallbackContext) -> None:
     """Bot hatalarını işler."""
@@ -387,6 +1452,61 @@ def error_handler(update: Update, context: CallbackContext) -> None:
     except:
         pass
 
+def calculate_portfolio_value(user_portfolio: dict, prices: dict, currency: str = DEFAULT_CURRENCY) -> dict:
+    """Portföyün değerini önceden alınmış USD fiyatlarıyla hesaplar.
+
+    API çağrısı yapmaz; böylece aynı fiyat verisi birden fazla kullanıcının
+    portföyü için tekrar kullanılabilir. Görüntüleme para birimindeki değer
+    kur tablosundan yerel olarak hesaplanır.
+    """
+    fx_rate = get_fx_rate(currency)
+    if fx_rate is None:
+        # Kur bilinmiyorsa yalnızca USD göster
+        currency, fx_rate = 'usd', 1.0
+    holdings = []
+    total_usd = 0
+    total_usd_24h_ago = 0
+    
+    for crypto_id, data in user_portfolio.items():
+        amount = data["amount"]
+        if amount <= 0:
+            continue
+        
+        if crypto_id not in prices:
+            holdings.append({"id": crypto_id, "amount": amount, "error": True})
+            continue
+        
+        price_usd = prices[crypto_id].get("usd", 0)
+        change_24h = prices[crypto_id].get("usd_24h_change") or 0
+        
+        value_usd = amount * price_usd
+        total_usd += value_usd
+        total_usd_24h_ago += value_usd / (1 + change_24h / 100)
+        
+        holdings.append({
+            "id": crypto_id,
+            "amount": amount,
+            "price_usd": price_usd,
+            "value_usd": value_usd,
+            "value_local": value_usd * fx_rate,
+            "change_24h": change_24h
+        })
+    
+    # 24 saatlik toplam değişim - sıfıra bölme kontrolü
+    if total_usd_24h_ago > 0:
+        total_change_24h = (total_usd / total_usd_24h_ago - 1) * 100
+    else:
+        total_change_24h = 0
+    
+    return {
+        "holdings": holdings,
+        "total_usd": total_usd,
+        "total_local": total_usd * fx_rate,
+        "currency": currency,
+        "fx_rate": fx_rate,
+        "change_24h": total_change_24h
+    }
+
 def portfolio_command(update: Update, context: CallbackContext) -> None:
     """Kullanıcının portföyünü gösterir."""
     user_id = str(update.effective_user.id)
@@ -404,39 +1524,35 @@ def portfolio_command(update: Update, context: CallbackContext) -> None:
         update.message.reply_text("Portföyünüz boş.")
         return
     
+    # Tüm kriptoların fiyatlarını tek bir istekle al
+    prices = get_crypto_prices(
+        crypto_id for crypto_id, data in user_portfolio.items() if data["amount"] > 0
+    )
+    valuation = calculate_portfolio_value(user_portfolio, prices, get_user_currency(user_id))
+    
     message = "*📊 Portföyünüz:*\n\n"
-    total_portfolio_value = 0
     
-    for crypto_id, data in user_portfolio.items():
-        amount = data["amount"]
-        if amount <= 0:
+    for holding in valuation["holdings"]:
+        # İsmin ilk harfini büyük yap
+        crypto_name = holding["id"].capitalize()
+        
+        if holding.get("error"):
+            message += f"*{crypto_name}*: Fiyat verisi alınamadı\n\n"
             continue
-            
-        # Güncel fiyat bilgisini al
-        price_data = get_crypto_price(crypto_id)
         
-        if "error" not in price_data:
-            price_usd = price_data["data"].get("usd", 0)
-            price_try = price_data["data"].get("try", 0)
-            
-            value_usd = amount * price_usd
-            value_try = amount * price_try
-            total_portfolio_value += value_usd
-            
-            # İsmin ilk harfini büyük yap
-            crypto_name = crypto_id.capitalize()
-            
-            message += f"*{crypto_name}*\n"
-            message += f"💰 Miktar: {amount:.8f}\n"
-            message += f"💵 Değer: ${value_usd:.2f} (₺{value_try:.2f})\n"
-            message += f"🏷️ Güncel Fiyat: ${price_usd:.2f}\n\n"
-        else:
-            message += f"*{crypto_id.capitalize()}*: Fiyat verisi alınamadı\n\n"
+        message += f"*{crypto_name}*\n"
+        message += f"💰 Miktar: {holding['amount']:.8f}\n"
+        message += f"💵 Değer: ${holding['value_usd']:.2f}"
+        message += format_local_suffix(holding['value_usd'], valuation['currency'], valuation['fx_rate'])
+        message += "\n"
+        message += f"🏷️ Güncel Fiyat: ${holding['price_usd']:.2f}\n\n"
     
-    message += f"*Toplam Portföy Değeri:* ${total_portfolio_value:.2f}\n"
+    message += f"*Toplam Portföy Değeri:* ${valuation['total_usd']:.2f}"
+    message += format_local_suffix(valuation['total_usd'], valuation['currency'], valuation['fx_rate'])
+    message += "\n"
     message += "\nDetaylı kar/zarar analizi için /performance komutunu kullanabilirsiniz."
     
-    update.message.reply_text(message, parse_mode=ParseMode.MARKDOWN)
+    update.message.reply_text(message, parse_mode=PARSE_MODE_MARKDOWN)
 
 def add_transaction(update: Update, context: CallbackContext) -> None:
     """Kullanıcının portföyüne yeni bir işlem ekler."""
@@ -512,30 +1628,6 @@ def add_transaction(update: Update, context: CallbackContext) -> None:
             update.message.reply_text("Geçersiz işlem tipi. 'buy' veya 'sell' kullanın.")
             return
         
-        # Kullanıcının portföyünü oluştur (yoksa)
-        if user_id not in user_portfolios:
-            user_portfolios[user_id] = {"portfolio": {}}
-        
-        if "portfolio" not in user_portfolios[user_id]:
-            user_portfolios[user_id]["portfolio"] = {}
-        
-        # Kripto para portföyde var mı kontrol et
-        if crypto_id not in user_portfolios[user_id]["portfolio"]:
-            user_portfolios[user_id]["portfolio"][crypto_id] = {
-                "amount": 0,
-                "transactions": []
-            }
-        
-        # Satış yapılıyorsa, yeterli miktar var mı kontrol et
-        if transaction_type == "sell":
-            current_amount = user_portfolios[user_id]["portfolio"][crypto_id]["amount"]
-            if amount > current_amount:
-                update.message.reply_text(
-                    f"Yeterli miktarda {crypto_id.capitalize()} yok. "
-                    f"Mevcut miktar: {current_amount}"
-                )
-                return
-        
         # İşlemi portföye ekle
         transaction = {
             "date": date,
@@ -545,16 +1637,48 @@ def add_transaction(update: Update, context: CallbackContext) -> None:
             "fee": fee
         }
         
-        user_portfolios[user_id]["portfolio"][crypto_id]["transactions"].append(transaction)
+        # Diğer kullanıcıların kayıt işlemleriyle çakışmaması için kilit altında güncelle
+        with store_lock:
+            # Kullanıcının portföyünü oluştur (yoksa)
+            if user_id not in user_portfolios:
+                user_portfolios[user_id] = {"portfolio": {}}
+            
+            if "portfolio" not in user_portfolios[user_id]:
+                user_portfolios[user_id]["portfolio"] = {}
+            
+            # Kripto para portföyde var mı kontrol et
+            if crypto_id not in user_portfolios[user_id]["portfolio"]:
+                user_portfolios[user_id]["portfolio"][crypto_id] = {
+                    "amount": 0,
+                    "transactions": []
+                }
+            
+            # Satış yapılıyorsa, yeterli miktar var mı kontrol et
+            current_amount = user_portfolios[user_id]["portfolio"][crypto_id]["amount"]
+            insufficient = transaction_type == "sell" and amount > current_amount
+            
+            if not insufficient:
+                user_portfolios[user_id]["portfolio"][crypto_id]["transactions"].append(transaction)
+                
+                # Geriye dönük işlemlerde değer geçmişinin etkilenen kısmını geçersiz kıl
+                invalidate_history(user_id, date, save=False)
+                
+                # Toplam miktarı güncelle
+                if transaction_type == "buy":
+                    user_portfolios[user_id]["portfolio"][crypto_id]["amount"] += amount
+                else:  # sell
+                    user_portfolios[user_id]["portfolio"][crypto_id]["amount"] -= amount
         
-        # Toplam miktarı güncelle
-        if transaction_type == "buy":
-            user_portfolios[user_id]["portfolio"][crypto_id]["amount"] += amount
-        else:  # sell
-            user_portfolios[user_id]["portfolio"][crypto_id]["amount"] -= amount
+        if insufficient:
+            update.message.reply_text(
+                f"Yeterli miktarda {crypto_id.capitalize()} yok. "
+                f"Mevcut miktar: {current_amount}"
+            )
+            return
         
-        # Değişiklikleri kaydet
+        # Değişiklikleri kilidin dışında kaydet
         save_portfolios(user_portfolios)
+        save_history(user_history)
         
         update.message.reply_text(
             f"{transaction_type.capitalize()} işlemi başarıyla eklendi!\n"
@@ -567,22 +1691,14 @@ def add_transaction(update: Update, context: CallbackContext) -> None:
         logger.error(f"İşlem eklenirken hata: {e}")
         update.message.reply_text(f"İşlem eklenirken bir hata oluştu: {str(e)}")
 
-def performance_command(update: Update, context: CallbackContext) -> None:
-    """Portföyün performansını ve kar/zarar durumunu gösterir."""
-    user_id = str(update.effective_user.id)
-    
-    if user_id not in user_portfolios or "portfolio" not in user_portfolios[user_id]:
-        update.message.reply_text(
-            "Henüz portföyünüzde kripto para bulunmuyor.\n"
-            "İşlem eklemek için /add_transaction komutunu kullanabilirsiniz."
-        )
-        return
-    
-    user_portfolio = user_portfolios[user_id]["portfolio"]
-    
-    if not user_portfolio:
-        update.message.reply_text("Portföyünüz boş.")
-        return
+def compute_performance_message(user_portfolio: dict, prices: dict, currency: str = 'usd', fx_rate: float = 1.0) -> str:
+    """Portföyün kar/zarar raporunu önceden alınmış fiyatlarla hesaplar.
+
+    Yalnızca verilen argümanlarla çalışır (kur da çağırandan alınır); bu sayede
+    büyük portföylerde işlem havuzunda (ayrı süreçte) çalıştırılabilir.
+    """
+    def local(amount_usd: float) -> str:
+        return format_local_suffix(amount_usd, currency, fx_rate)
     
     message = "*📈 Portföy Performansı:*\n\n"
     total_investment = 0
@@ -592,11 +1708,8 @@ def performance_command(update: Update, context: CallbackContext) -> None:
         if not data["transactions"]:
             continue
             
-        # Güncel fiyat bilgisini al
-        price_data = get_crypto_price(crypto_id)
-        
-        if "error" not in price_data:
-            current_price = price_data["data"].get("usd", 0)
+        if crypto_id in prices:
+            current_price = prices[crypto_id].get("usd", 0)
             current_amount = data["amount"]
             
             # Yatırım miktarını ve kar/zararı hesapla
@@ -636,11 +1749,11 @@ def performance_command(update: Update, context: CallbackContext) -> None:
                 
                 message += f"*{crypto_name}*\n"
                 message += f"💰 Mevcut Miktar: {current_amount:.8f}\n"
-                message += f"💵 Güncel Değer: ${current_value:.2f}\n"
-                message += f"💲 Toplam Yatırım: ${invested:.2f}\n"
+                message += f"💵 Güncel Değer: ${current_value:.2f}{local(current_value)}\n"
+                message += f"💲 Toplam Yatırım: ${invested:.2f}{local(invested)}\n"
                 
                 emoji = "🟢" if total_pl >= 0 else "🔴"
-                message += f"{emoji} Kar/Zarar: ${total_pl:.2f} (%{percent_change:.2f})\n\n"
+                message += f"{emoji} Kar/Zarar: ${total_pl:.2f}{local(total_pl)} (%{percent_change:.2f})\n\n"
                 
                 total_investment += invested
                 total_current_value += current_value
@@ -656,7 +1769,7 @@ def performance_command(update: Update, context: CallbackContext) -> None:
                 
                 message += f"*{crypto_id.capitalize()}* (Tümü Satıldı)\n"
                 emoji = "🟢" if realized_pl >= 0 else "🔴"
-                message += f"{emoji} Gerçekleşen Kar/Zarar: ${realized_pl:.2f} (%{percent_change:.2f})\n\n"
+                message += f"{emoji} Gerçekleşen Kar/Zarar: ${realized_pl:.2f}{local(realized_pl)} (%{percent_change:.2f})\n\n"
         else:
             message += f"*{crypto_id.capitalize()}*: Fiyat verisi alınamadı\n\n"
     
@@ -666,18 +1779,53 @@ def performance_command(update: Update, context: CallbackContext) -> None:
         total_percent = (total_pl / total_investment) * 100
         
         message += f"*Toplam Portföy:*\n"
-        message += f"💲 Toplam Yatırım: ${total_investment:.2f}\n"
-        message += f"💵 Güncel Değer: ${total_current_value:.2f}\n"
+        message += f"💲 Toplam Yatırım: ${total_investment:.2f}{local(total_investment)}\n"
+        message += f"💵 Güncel Değer: ${total_current_value:.2f}{local(total_current_value)}\n"
         
         emoji = "🟢" if total_pl >= 0 else "🔴"
-        message += f"{emoji} Toplam Kar/Zarar: ${total_pl:.2f} (%{total_percent:.2f})"
+        message += f"{emoji} Toplam Kar/Zarar: ${total_pl:.2f}{local(total_pl)} (%{total_percent:.2f})"
     elif total_current_value > 0:
         # Toplam yatırım sıfırsa ancak portföyde değer varsa
         message += f"*Toplam Portföy:*\n"
-        message += f"💵 Güncel Değer: ${total_current_value:.2f}\n"
+        message += f"💵 Güncel Değer: ${total_current_value:.2f}{local(total_current_value)}\n"
         message += "💲 Yatırım miktarı hesaplanamadı"
     
-    update.message.reply_text(message, parse_mode=ParseMode.MARKDOWN)
+    return message
+
+def performance_command(update: Update, context: CallbackContext) -> None:
+    """Portföyün performansını ve kar/zarar durumunu gösterir."""
+    user_id = str(update.effective_user.id)
+    
+    if user_id not in user_portfolios or "portfolio" not in user_portfolios[user_id]:
+        update.message.reply_text(
+            "Henüz portföyünüzde kripto para bulunmuyor.\n"
+            "İşlem eklemek için /add_transaction komutunu kullanabilirsiniz."
+        )
+        return
+    
+    user_portfolio = user_portfolios[user_id]["portfolio"]
+    
+    if not user_portfolio:
+        update.message.reply_text("Portföyünüz boş.")
+        return
+    
+    # Fiyatları tek bir istekle al, hesaplamayı işlem havuzunda yap; yanıt,
+    # io iş parçacığını bekletmeden hesaplama bitince gönderilir
+    prices = get_crypto_prices(
+        crypto_id for crypto_id, data in user_portfolio.items() if data["transactions"]
+    )
+    currency = get_user_currency(user_id)
+    fx_rate = get_fx_rate(currency)
+    
+    def reply(message: str) -> None:
+        update.message.reply_text(message, parse_mode=PARSE_MODE_MARKDOWN)
+    
+    def report_error(error: Exception) -> None:
+        context.dispatcher.dispatch_error(update, error)
+    
+    handler_executor.submit_cpu(
+        reply, report_error, compute_performance_message, user_portfolio, prices, currency, fx_rate
+    )
 
 def list_transactions(update: Update, context: CallbackContext) -> None:
     """Kullanıcının tüm işlemlerini listeler."""
@@ -712,7 +1860,7 @@ def list_transactions(update: Update, context: CallbackContext) -> None:
     
     message += "İşlem silmek için /delete_transaction [kripto_kodu] [işlem_no] komutunu kullanabilirsiniz."
     
-    update.message.reply_text(message, parse_mode=ParseMode.MARKDOWN)
+    update.message.reply_text(message, parse_mode=PARSE_MODE_MARKDOWN)
 
 def delete_transaction(update: Update, context: CallbackContext) -> None:
     """Belirtilen işlemi siler."""
@@ -752,20 +1900,24 @@ def delete_transaction(update: Update, context: CallbackContext) -> None:
             update.message.reply_text("Geçersiz kripto para veya işlem numarası.")
             return
         
-        # İşlemi al
-        transaction = user_portfolios[user_id]["portfolio"][crypto_id]["transactions"][transaction_index]
-        
-        # Toplam miktarı güncelle
-        if transaction["type"] == "buy":
-            user_portfolios[user_id]["portfolio"][crypto_id]["amount"] -= transaction["amount"]
-        else:  # sell
-            user_portfolios[user_id]["portfolio"][crypto_id]["amount"] += transaction["amount"]
-        
-        # İşlemi sil
-        del user_portfolios[user_id]["portfolio"][crypto_id]["transactions"][transaction_index]
+        # Diğer kullanıcıların kayıt işlemleriyle çakışmaması için kilit altında güncelle
+        with store_lock:
+            # İşlemi al
+            transaction = user_portfolios[user_id]["portfolio"][crypto_id]["transactions"][transaction_index]
+            
+            # Toplam miktarı güncelle
+            if transaction["type"] == "buy":
+                user_portfolios[user_id]["portfolio"][crypto_id]["amount"] -= transaction["amount"]
+            else:  # sell
+                user_portfolios[user_id]["portfolio"][crypto_id]["amount"] += transaction["amount"]
+            
+            # İşlemi sil
+            del user_portfolios[user_id]["portfolio"][crypto_id]["transactions"][transaction_index]
+            invalidate_history(user_id, transaction["date"], save=False)
         
-        # Değişiklikleri kaydet
+        # Değişiklikleri kilidin dışında kaydet
         save_portfolios(user_portfolios)
+        save_history(user_history)
         
         update.message.reply_text(
             f"İşlem başarıyla silindi!\n"
@@ -778,6 +1930,433 @@ def delete_transaction(update: Update, context: CallbackContext) -> None:
         logger.error(f"İşlem silinirken hata: {e}")
         update.message.reply_text(f"İşlem silinirken bir hata oluştu: {str(e)}")
 
+def get_daily_closes(crypto_id: str, start_day: date, end_day: date, save: bool = True) -> dict:
+    """Kriptonun [start_day, end_day] aralığındaki günlük kapanış fiyatlarını döndürür.
+
+    Önbellekte olmayan günler tek bir aralık isteğiyle çekilir; veri olmayan
+    günler için bir önceki kapanış kullanılır. Bir günün kapanışı, o güne ait
+    son fiyat noktasıdır; tam 00:00 UTC'deki nokta bir önceki günü kapatır
+    (90 günden uzun aralıklarda CoinGecko yalnızca bu noktaları döndürür).
+    Toplu güncellemeler save=False verip dosyayı sonunda bir kez kaydeder.
+    """
+    with store_lock:
+        cached = daily_closes.setdefault(crypto_id, {})
+    days = [start_day + timedelta(days=i) for i in range((end_day - start_day).days + 1)]
+    missing = [day for day in days if day.isoformat() not in cached]
+    
+    if missing:
+        from_timestamp = datetime.combine(missing[0], dt_time.min, timezone.utc).timestamp()
+        # Son günü kapatan ertesi gece yarısı noktasının da gelmesi için bir saat pay bırak
+        to_timestamp = datetime.combine(missing[-1] + timedelta(days=1), dt_time.min, timezone.utc).timestamp() + 3600
+        chart = get_cg().get_coin_market_chart_range_by_id(
+            id=crypto_id,
+            vs_currency='usd',
+            from_timestamp=int(from_timestamp),
+            to_timestamp=int(to_timestamp)
+        )
+        
+        # Her nokta kapattığı güne atanır: 1 ms geri almak tam gece yarısındaki
+        # noktayı önceki güne, diğerlerini kendi günlerine düşürür
+        fetched = {}
+        for timestamp, price in chart.get("prices", []):
+            day = datetime.fromtimestamp((timestamp - 1) / 1000, timezone.utc).date().isoformat()
+            fetched[day] = price
+        
+        with store_lock:
+            previous_close = cached.get((missing[0] - timedelta(days=1)).isoformat())
+            for day in missing:
+                previous_close = fetched.get(day.isoformat(), previous_close)
+                cached[day.isoformat()] = previous_close
+        
+        if save:
+            save_daily_closes(daily_closes)
+    
+    return {day.isoformat(): cached[day.isoformat()] for day in days}
+
+def replay_holdings(user_portfolio: dict, before: str) -> dict:
+    """Belirtilen tarihten önceki işlemleri uygulayarak o günkü varlıkları hesaplar."""
+    holdings = {}
+    for crypto_id, data in user_portfolio.items():
+        for transaction in data["transactions"]:
+            if transaction["date"] < before:
+                sign = 1 if transaction["type"] == "buy" else -1
+                holdings[crypto_id] = holdings.get(crypto_id, 0) + sign * transaction["amount"]
+    return holdings
+
+def invalidate_history(user_id: str, date_str: str, save: bool = True) -> None:
+    """Geriye dönük bir işlem değişikliğinde yalnızca etkilenen günleri geçersiz kılar.
+
+    Kilit altında portföyle birlikte güncelleyen çağıranlar save=False verip
+    kaydı kilidi bıraktıktan sonra yapar.
+    """
+    with store_lock:
+        series = user_history.get(user_id)
+        if series is None:
+            return
+        
+        if date_str < series["start"]:
+            # Seri başlangıcından önceki bir değişiklik: seriyi baştan oluştur
+            del user_history[user_id]
+        else:
+            offset = (date.fromisoformat(date_str) - date.fromisoformat(series["start"])).days
+            if offset >= len(series["values"]):
+                return
+            del series["values"][offset:]
+            series["holdings"] = replay_holdings(user_portfolios[user_id]["portfolio"], date_str)
+    
+    if save:
+        save_history(user_history)
+
+def update_history(user_id: str, save: bool = True) -> dict:
+    """Kullanıcının günlük değer serisini dünün kapanışına kadar artımlı olarak uzatır.
+
+    Her gün, bir önceki günün varlıklarına o günün işlemleri eklenerek ve
+    önbellekteki günlük kapanış fiyatıyla değerlenerek hesaplanır. Toplu
+    güncellemeler save=False verip dosyaları sonunda bir kez kaydeder.
+    """
+    with store_lock:
+        user_portfolio = dict(user_portfolios.get(user_id, {}).get("portfolio", {}))
+        series = user_history.get(user_id)
+    had_series = series is not None
+    
+    transaction_dates = [
+        transaction["date"]
+        for data in user_portfolio.values()
+        for transaction in data["transactions"]
+    ]
+    if not transaction_dates:
+        return None
+    
+    if series is None:
+        series = {"start": min(transaction_dates), "values": [], "holdings": {}}
+    
+    start_day = date.fromisoformat(series["start"])
+    known_days = len(series["values"])
+    next_day = start_day + timedelta(days=known_days)
+    end_day = datetime.now(timezone.utc).date() - timedelta(days=1)
+    if next_day > end_day:
+        with store_lock:
+            current = user_history.get(user_id)
+            if current is None and not had_series:
+                user_history[user_id] = series
+                return series
+        # Seri okunduktan sonra geçersiz kılınıp silindiyse baştan oluştur
+        return current if current is not None else update_history(user_id, save)
+    
+    # Uzatılacak aralıktaki işlemleri günlere göre grupla
+    daily_changes = {}
+    for crypto_id, data in user_portfolio.items():
+        for transaction in data["transactions"]:
+            if next_day.isoformat() <= transaction["date"] <= end_day.isoformat():
+                sign = 1 if transaction["type"] == "buy" else -1
+                changes = daily_changes.setdefault(transaction["date"], {})
+                changes[crypto_id] = changes.get(crypto_id, 0) + sign * transaction["amount"]
+    
+    crypto_ids = set(series["holdings"]) | {
+        crypto_id for changes in daily_changes.values() for crypto_id in changes
+    }
+    try:
+        closes = {crypto_id: get_daily_closes(crypto_id, next_day, end_day, save) for crypto_id in crypto_ids}
+    except Exception as e:
+        logger.error(f"Günlük kapanış fiyatları alınırken hata: {e}")
+        return series if user_id in user_history else None
+    
+    holdings = dict(series["holdings"])
+    values = []
+    day = next_day
+    while day <= end_day:
+        day_str = day.isoformat()
+        for crypto_id, change in daily_changes.get(day_str, {}).items():
+            holdings[crypto_id] = holdings.get(crypto_id, 0) + change
+        
+        value = sum(amount * (closes[crypto_id][day_str] or 0) for crypto_id, amount in holdings.items())
+        values.append(round(value, 2))
+        day += timedelta(days=1)
+    
+    with store_lock:
+        # Bu sırada seri başka bir iş parçacığınca silindiyse, değiştirildiyse ya da
+        # oluşturulduysa hesaplanan değerler eskimiştir; güncel olanı kullan
+        current = user_history.get(user_id)
+        removed = had_series and current is None
+        if current is not None and (current is not series or len(current["values"]) != known_days):
+            return current
+        
+        if not removed:
+            series["values"].extend(values)
+            series["holdings"] = holdings
+            user_history[user_id] = series
+    
+    if not removed:
+        if save:
+            save_history(user_history)
+        return series
+    
+    # Seri bu sırada geçersiz kılınıp silindi: eski değerleri yazmadan baştan oluştur
+    return update_history(user_id, save)
+
+def update_all_histories(context: CallbackContext) -> None:
+    """Her gün tüm kullanıcıların değer serisine bir önceki günü ekler."""
+    readiness["stores"].wait()
+    for user_id in list(user_portfolios):
+        update_history(user_id, save=False)
+    
+    # Dosyaları kullanıcı başına değil, tüm güncellemelerden sonra bir kez kaydet
+    save_daily_closes(daily_closes)
+    save_history(user_history)
+    logger.info("Günlük portföy geçmişleri güncellendi")
+
+def history_command(update: Update, context: CallbackContext) -> None:
+    """Portföyün günlük değer geçmişini gösterir."""
+    days = HISTORY_DEFAULT_DAYS
+    if context.args:
+        match = re.match(r'^(\d+)d?$', context.args[0].lower())
+        if not match or int(match.group(1)) == 0:
+            update.message.reply_text("Geçersiz süre. Örnek: /history 90d")
+            return
+        days = min(int(match.group(1)), HISTORY_MAX_DAYS)
+    
+    user_id = str(update.effective_user.id)
+    series = update_history(user_id)
+    
+    if not series or not series["values"]:
+        update.message.reply_text(
+            "Henüz portföy geçmişiniz bulunmuyor.\n"
+            "Geçmiş, işlemlerinizin tarihinden itibaren günlük kapanış değerleriyle oluşturulur."
+        )
+        return
+    
+    values = series["values"][-days:]
+    first_day = date.fromisoformat(series["start"]) + timedelta(days=len(series["values"]) - len(values))
+    
+    start_value = values[0]
+    end_value = values[-1]
+    change = end_value - start_value
+    percent_change = (change / start_value) * 100 if start_value > 0 else 0
+    emoji = "🟢" if change >= 0 else "🔴"
+    
+    # Değerler günlük USD kapanışlarıdır; bugünkü kurla çevirmek yanıltıcı olacağından
+    # görüntüleme para birimi burada uygulanmaz
+    message = f"*📅 Portföy Geçmişi (son {len(values)} gün):*\n\n"
+    message += f"💵 Başlangıç: ${start_value:,.2f}\n"
+    message += f"💵 Son: ${end_value:,.2f}\n"
+    message += f"{emoji} Değişim: ${change:,.2f} (%{percent_change:.2f})\n"
+    message += f"⬆️ En Yüksek: ${max(values):,.2f}\n"
+    message += f"⬇️ En Düşük: ${min(values):,.2f}\n\n"
+    
+    # Seriyi eşit aralıklı örneklerle göster (son gün her zaman dahil)
+    step = max(1, len(values) // HISTORY_DISPLAY_ROWS)
+    indexes = list(range(len(values) - 1, -1, -step))[:HISTORY_DISPLAY_ROWS][::-1]
+    message += "```\n"
+    for i in indexes:
+        message += f"{(first_day + timedelta(days=i)).isoformat()}  ${values[i]:,.2f}\n"
+    message += "```"
+    
+    update.message.reply_text(message, parse_mode=PARSE_MODE_MARKDOWN)
+
+class ThrottledSender:
+    """Mesajları Telegram hız sınırını aşmadan arka planda sırayla gönderir.
+
+    Gönderimler, her mesaja bir sonraki boş zaman dilimini (monotonic saat)
+    ayıran ortak bir takvimle hızlandırılır; bekleme yalnızca zaman dilimi
+    henüz gelmediyse yapılır.
+    """
+    
+    def __init__(self, bot, rate: float = DIGEST_SEND_RATE, threads: int = DIGEST_SENDER_THREADS):
+        self.bot = bot
+        self.interval = 1.0 / rate
+        self._queue = queue.Queue()
+        self._next_send = time.monotonic()
+        self._pace_lock = threading.Lock()
+        self._threads = [
+            threading.Thread(target=self._run, name=f"throttled-sender-{i}", daemon=True)
+            for i in range(threads)
+        ]
+    
+    def start(self) -> None:
+        for thread in self._threads:
+            thread.start()
+    
+    def _wait_for_slot(self) -> None:
+        """Bir sonraki gönderim zaman dilimini ayırır ve gelene kadar bekler."""
+        with self._pace_lock:
+            now = time.monotonic()
+            send_at = max(self._next_send, now)
+            self._next_send = send_at + self.interval
+        if send_at > now:
+            time.sleep(send_at - now)
+    
+    def _pause(self, seconds: float) -> None:
+        """Tüm gönderimleri belirtilen süre kadar erteler."""
+        with self._pace_lock:
+            self._next_send = max(self._next_send, time.monotonic() + seconds)
+    
+    def send(self, chat_id, text: str, user_id: str) -> None:
+        """Kullanıcının özet mesajını gönderim kuyruğuna ekler."""
+        self._queue.put((chat_id, text, user_id))
+    
+    def _run(self) -> None:
+        from telegram.error import RetryAfter, Unauthorized
+        
+        while True:
+            chat_id, text, user_id = self._queue.get()
+            self._wait_for_slot()
+            try:
+                self.bot.send_message(chat_id, text, parse_mode=PARSE_MODE_MARKDOWN)
+            except RetryAfter as e:
+                # Telegram yavaşlamamızı istedi: tüm gönderimleri ertele ve mesajı yeniden kuyruğa al
+                logger.warning(f"Hız sınırına takıldı, {e.retry_after} sn bekleniyor")
+                self._pause(e.retry_after)
+                self._queue.put((chat_id, text, user_id))
+            except Unauthorized:
+                # Kullanıcı botu engellemiş: aboneliğini iptal et
+                unsubscribe_digest(user_id)
+            except Exception as e:
+                logger.error(f"Özet gönderilirken hata ({chat_id}): {e}")
+
+# Özet mesajlarını gönderen kuyruk (main() içinde başlatılır)
+digest_sender = None
+
+def subscribe_digest(user_id: str, chat_id: int, delivery_time: str) -> None:
+    """Kullanıcıyı belirtilen dakikada günlük özete abone eder."""
+    with store_lock:
+        unsubscribe_digest(user_id, save=False)
+        user_digests[user_id] = {"time": delivery_time, "chat_id": chat_id}
+        digest_index.setdefault(delivery_time, set()).add(user_id)
+    save_digests(user_digests)
+
+def unsubscribe_digest(user_id: str, save: bool = True) -> bool:
+    """Kullanıcının günlük özet aboneliğini iptal eder."""
+    with store_lock:
+        subscription = user_digests.pop(user_id, None)
+        if subscription is None:
+            return False
+        
+        subscribers = digest_index.get(subscription["time"])
+        if subscribers:
+            subscribers.discard(user_id)
+            if not subscribers:
+                del digest_index[subscription["time"]]
+    
+    if save:
+        save_digests(user_digests)
+    return True
+
+def digest_now() -> datetime:
+    """Özet saat diliminde (DIGEST_TIMEZONE) şu anki zamanı döndürür."""
+    import pytz
+    return datetime.now(pytz.timezone(DIGEST_TIMEZONE))
+
+def format_digest_message(valuation: dict) -> str:
+    """Portföy değerlemesini günlük özet mesajına dönüştürür."""
+    message = f"*☀️ Günlük Portföy Özeti* ({digest_now().strftime('%Y-%m-%d')})\n\n"
+    
+    for holding in valuation["holdings"]:
+        crypto_name = holding["id"].capitalize()
+        
+        if holding.get("error"):
+            message += f"*{crypto_name}*: Fiyat verisi alınamadı\n"
+            continue
+        
+        emoji = "🟢" if holding["change_24h"] > 0 else "🔴"
+        message += f"*{crypto_name}*: ${holding['value_usd']:,.2f} | {emoji} %{holding['change_24h']:.2f}\n"
+    
+    emoji = "🟢" if valuation["change_24h"] > 0 else "🔴"
+    message += f"\n*Toplam Değer:* ${valuation['total_usd']:,.2f}"
+    if valuation["currency"] != "usd":
+        message += f" ({format_money(valuation['total_local'], valuation['currency'])})"
+    message += "\n"
+    message += f"{emoji} *24s Değişim*: %{valuation['change_24h']:.2f}"
+    
+    return message
+
+def digest_command(update: Update, context: CallbackContext) -> None:
+    """Günlük portföy özeti aboneliğini yönetir."""
+    user_id = str(update.effective_user.id)
+    
+    # Özet kullanıcının portföyünü içerdiğinden yalnızca özel sohbette gönderilir
+    if update.effective_chat.type != 'private':
+        update.message.reply_text("Günlük özet yalnızca bot ile özel sohbette ayarlanabilir.")
+        return
+    
+    if not context.args:
+        if user_id in user_digests:
+            update.message.reply_text(
+                f"Günlük özetiniz her gün {user_digests[user_id]['time']} ({DIGEST_TIMEZONE}) saatinde gönderiliyor.\n"
+                "Kapatmak için /digest off komutunu kullanabilirsiniz."
+            )
+        else:
+            update.message.reply_text(
+                f"Günlük portföy özeti almak için bir saat belirtin ({DIGEST_TIMEZONE} saatiyle).\n"
+                "Örnek: /digest 09:00"
+            )
+        return
+    
+    argument = context.args[0].lower()
+    
+    if argument in ("off", "kapat"):
+        if unsubscribe_digest(user_id):
+            update.message.reply_text("Günlük özet aboneliğiniz iptal edildi. ✅")
+        else:
+            update.message.reply_text("Aktif bir günlük özet aboneliğiniz bulunmuyor.")
+        return
+    
+    try:
+        delivery_time = datetime.strptime(argument, "%H:%M").strftime("%H:%M")
+    except ValueError:
+        update.message.reply_text("Geçersiz saat formatı. Lütfen SS:DD formatında girin. Örnek: /digest 09:00")
+        return
+    
+    subscribe_digest(user_id, update.effective_chat.id, delivery_time)
+    update.message.reply_text(f"Portföy özetiniz her gün {delivery_time} ({DIGEST_TIMEZONE}) saatinde gönderilecek! ☀️")
+
+def digest_tick(context: CallbackContext) -> None:
+    """Her dakika çalışır ve o dakikanın abonelerine özetlerini gönderir.
+
+    Abonelerin tüm kriptoları tek bir toplu istekle fiyatlandırılır; böylece
+    maliyet abone sayısıyla değil farklı kripto sayısıyla ölçeklenir.
+    """
+    if not readiness["stores"].is_set():
+        return
+    
+    subscribers = digest_index.get(digest_now().strftime("%H:%M"))
+    if not subscribers:
+        return
+    
+    portfolios = {}
+    with store_lock:
+        subscribers = list(subscribers)
+        for user_id in subscribers:
+            user_portfolio = user_portfolios.get(user_id, {}).get("portfolio")
+            if user_portfolio:
+                portfolios[user_id] = dict(user_portfolio)
+    
+    # Abonelerin sahip olduğu kriptoların birleşimini tek seferde fiyatlandır
+    crypto_ids = {
+        crypto_id
+        for user_portfolio in portfolios.values()
+        for crypto_id, data in user_portfolio.items()
+        if data["amount"] > 0
+    }
+    prices = get_crypto_prices(crypto_ids) if crypto_ids else {}
+    
+    for user_id in subscribers:
+        subscription = user_digests.get(user_id)
+        if subscription is None:
+            continue
+        
+        if user_id in portfolios:
+            valuation = calculate_portfolio_value(portfolios[user_id], prices, get_user_currency(user_id))
+            message = format_digest_message(valuation)
+        else:
+            message = (
+                "Günlük özet: Portföyünüz boş.\n"
+                "İşlem eklemek için /add_transaction komutunu kullanabilirsiniz."
+            )
+        
+        digest_sender.send(subscription["chat_id"], message, user_id)
+    
+    logger.info(f"{len(subscribers)} aboneye özet kuyruğa alındı ({len(crypto_ids)} farklı kripto)")
+
 def main() -> None:
     """Bot'u başlatır."""
     # Telegram API token'ını çevresel değişkenlerden al
@@ -786,6 +2365,17 @@ def main() -> None:
     if not token:
         logger.error("TELEGRAM_BOT_TOKEN çevresel değişkeni ayarlanmamış!")
         return
+    mark_startup("modüller yüklendi")
+    
+    # Sağlık uç noktalarını ve verilerin arka planda yüklenmesini hemen başlat
+    if HEALTH_PORT:
+        start_health_server()
+        mark_startup(f"sağlık sunucusu {HEALTH_HOST}:{HEALTH_PORT} üzerinde başladı")
+    threading.Thread(target=load_state, name="state-loader", daemon=True).start()
+    
+    from telegram import Update
+    from telegram.ext import Updater, CommandHandler, InlineQueryHandler, TypeHandler
+    mark_startup("telegram kütüphanesi yüklendi")
     
     # Updater'ı başlat
     updater = Updater(token)
@@ -793,32 +2383,72 @@ def main() -> None:
     # Dispatcher'ı al
     dispatcher = updater.dispatcher
     
-    # Komut işleyicilerini ekle
-    dispatcher.add_handler(CommandHandler("start", start))
-    dispatcher.add_handler(CommandHandler("help", help_command))
-    dispatcher.add_handler(CommandHandler("price", price_command))
-    dispatcher.add_handler(CommandHandler("list", list_command))
-    dispatcher.add_handler(CommandHandler("top", top_command))
-    dispatcher.add_handler(CommandHandler("add", add_favorite))
-    dispatcher.add_handler(CommandHandler("remove", remove_favorite))
-    dispatcher.add_handler(CommandHandler("favorites", show_favorites))
+    # Veriler yüklenmeden hiçbir güncellemenin işlenmemesi için en öncelikli grupta beklet
+    dispatcher.add_handler(TypeHandler(Update, wait_for_state), group=-1)
+    
+    # Komut işleyicilerini ekle; her komut kendi havuzunda (fast/io) çalışır
+    dispatcher.add_handler(CommandHandler("start", run_in_lane("fast", start)))
+    dispatcher.add_handler(CommandHandler("help", run_in_lane("fast", help_command)))
+    dispatcher.add_handler(CommandHandler("price", run_in_lane("io", price_command)))
+    dispatcher.add_handler(CommandHandler("list", run_in_lane("io", list_command)))
+    dispatcher.add_handler(CommandHandler("top", run_in_lane("io", top_command)))
+    dispatcher.add_handler(CommandHandler("gainers", run_in_lane("fast", gainers_command)))
+    dispatcher.add_handler(CommandHandler("losers", run_in_lane("fast", losers_command)))
+    dispatcher.add_handler(CommandHandler("screen", run_in_lane("fast", screen_command)))
+    dispatcher.add_handler(CommandHandler("add", run_in_lane("io", add_favorite)))
+    dispatcher.add_handler(CommandHandler("remove", run_in_lane("io", remove_favorite)))
+    dispatcher.add_handler(CommandHandler("favorites", run_in_lane("io", show_favorites)))
     
     # Portföy komutlarını ekle
-    dispatcher.add_handler(CommandHandler("portfolio", portfolio_command))
-    dispatcher.add_handler(CommandHandler("add_transaction", add_transaction))
-    dispatcher.add_handler(CommandHandler("performance", performance_command))
-    dispatcher.add_handler(CommandHandler("list_transactions", list_transactions))
-    dispatcher.add_handler(CommandHandler("delete_transaction", delete_transaction))
+    dispatcher.add_handler(CommandHandler("portfolio", run_in_lane("io", portfolio_command)))
+    dispatcher.add_handler(CommandHandler("add_transaction", run_in_lane("io", add_transaction)))
+    dispatcher.add_handler(CommandHandler("performance", run_in_lane("io", performance_command)))
+    dispatcher.add_handler(CommandHandler("list_transactions", run_in_lane("fast", list_transactions)))
+    dispatcher.add_handler(CommandHandler("delete_transaction", run_in_lane("io", delete_transaction)))
+    
+    dispatcher.add_handler(CommandHandler("history", run_in_lane("io", history_command)))
+    # Ayar komutlarını ekle
+    dispatcher.add_handler(CommandHandler("currency", run_in_lane("io", currency_command)))
+    
+    # Günlük özet komutunu ekle
+    dispatcher.add_handler(CommandHandler("digest", run_in_lane("io", digest_command)))
+    
+    # Satır içi sorgu işleyicisini ekle (kullanıcının diğer komutlarını beklemeden hızlı havuzda)
+    dispatcher.add_handler(InlineQueryHandler(run_in_lane("fast", inline_query_handler, serialize=False)))
     
     # Hata işleyicisini ekle
     dispatcher.add_error_handler(error_handler)
     
+    # Özet göndericisini başlat ve her dakikanın başında çalışacak zamanlayıcıyı kur
+    global digest_sender
+    digest_sender = ThrottledSender(updater.bot)
+    digest_sender.start()
+    updater.job_queue.run_repeating(digest_tick, interval=60, first=60 - datetime.now().second)
+    
+    # Döviz kuru tablosunu hemen ve ardından periyodik olarak yenile
+    updater.job_queue.run_repeating(refresh_fx_rates, interval=FX_REFRESH_INTERVAL, first=0)
+    
+    # Piyasa anlık görüntüsünü hemen ve ardından periyodik olarak yenile
+    updater.job_queue.run_repeating(refresh_market_snapshot, interval=MARKET_SNAPSHOT_INTERVAL, first=0)
+    
+    # Değer geçmişini her gün bir önceki günün kapanışıyla uzat
+    updater.job_queue.run_daily(update_all_histories, time=dt_time(0, 15))
+    
+    # Bot hazır olduğunda işlem havuzunu arka planda ısıt
+    def warm_when_ready():
+        for event in readiness.values():
+            event.wait()
+        handler_executor.warm_cpu_pool()
+    threading.Thread(target=warm_when_ready, name="cpu-pool-warmup", daemon=True).start()
+    
     # Bot'u başlat
     updater.start_polling()
+    mark_startup("polling başladı")
     logger.info("Bot başlatıldı!")
     
     # Bot Ctrl+C ile durdurulana kadar çalışmaya devam et
     updater.idle()
+    handler_executor.shutdown()
 
 if __name__ == '__main__':
     main() 
\ No newline at end of file